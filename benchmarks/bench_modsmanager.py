@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from servers import WORKSHOP_APP_ID
+
+PROVIDERS = ('thunderstore', 'github', 'nexusmods', 'workshop')
+
+
+def patch_providers(base_url: str):
+    # Every provider URL keeps its path and is served by the stand-in under a prefix named after the original host.
+    from vapordmods.api import github, nexusmods, thunderstore, thunderstore_index, worhshop
+
+    urls = [(thunderstore.thunderstore, '_THUNDERSTORE_API_URL_LATEST'),
+            (thunderstore.thunderstore, '_THUNDERSTORE_API_URL_VERSION'),
+            (thunderstore.thunderstore, '_THUNDERSTORE_DOWNLOAD_LINK'),
+            (thunderstore_index.ThunderstoreIndex, '_THUNDERSTORE_API_URL_COMMUNITY'),
+            (github.github, '_GITHUB_API_RELEASE'),
+            (github.github, '_GITHUB_API_RELEASE_LATEST'),
+            (github.github, '_GITHUB_API_RELEASE_TAG'),
+            (nexusmods.nexusmods, '_NEXUSMODS_API_URL_FILES'),
+            (nexusmods.nexusmods, '_NEXUSMODS_API_URL_DOWNLOAD_LINK'),
+            (nexusmods.nexusmods, '_NEXUSMODS_API_URL_UPDATED'),
+            (worhshop.workshop, '_WORKSHOP_API_DETAILS')]
+    for cls, attr in urls:
+        setattr(cls, attr, re.sub(r'^https://([^/]+)', base_url + r'/\1', getattr(cls, attr)))
+
+
+def write_config(install_dir: str, mods: int, providers: list):
+    lines = ['config:', f'  default_mods_dir: {os.path.join(install_dir, "mods")}', '', 'mods:']
+    for i in range(mods):
+        provider = providers[i % len(providers)]
+        if provider == 'thunderstore':
+            lines += ['  - provider: thunderstore', '    app: bench', f'    mods: Mod{i}']
+        elif provider == 'github':
+            lines += ['  - provider: github', '    app: bench', f'    mods: repo{i}', '    filename: mod.zip']
+        elif provider == 'nexusmods':
+            lines += ['  - provider: nexusmods', '    app: benchgame', f'    mods: {i}']
+        else:
+            lines += ['  - provider: workshop', f'    app: {WORKSHOP_APP_ID}', f'    mods: {100000 + i}']
+    with open(os.path.join(install_dir, 'vapordmods.yml'), 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+
+
+def get_peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_bytes_written():
+    try:
+        with open('/proc/self/io', 'r') as file:
+            return int(dict(x.split(': ') for x in file.read().splitlines())['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+async def measure(name: str, results: dict, coro):
+    written = get_bytes_written()
+    start = time.perf_counter()
+    status = await coro
+    results[name] = {'seconds': round(time.perf_counter() - start, 4), 'status': status}
+    if written is not None:
+        results[name]['bytes_written'] = get_bytes_written() - written
+
+
+async def run_child(args):
+    patch_providers(args.url)
+    from vapordmods.mods.modsmanager import ModsManager
+
+    root = tempfile.mkdtemp(prefix='vapordmods_bench_')
+    try:
+        install_dir = os.path.join(root, 'instance')
+        os.makedirs(install_dir)
+        write_config(install_dir, args.mods, args.providers.split(','))
+
+        rate_limits = None
+        if not args.rate_limits:
+            rate_limits = {x: {'rate': None} for x in ('api.nexusmods.com', 'api.github.com', 'api.steampowered.com')}
+
+        results = {'mods': args.mods}
+        manager = ModsManager(install_dir, user_app_data_dir=os.path.join(root, 'app'),
+                              max_concurrency=args.max_concurrency, thunderstore_community=args.community,
+                              extract_processes=args.extract_processes, rate_limits=rate_limits,
+                              download_segments=args.segments)
+        async with manager:
+            await measure('refresh_cold', results, manager.refresh_mods_info('bench', 'bench'))
+            results['resolved'] = len(manager.get_mods_status())
+
+            # Workshop items need a Steam login to be installed, so only their resolution is measured.
+            manager.mods_status = [x for x in manager.get_mods_status() if x['provider'] != 'workshop']
+            results['expected'] = len(manager.mods_status)
+            await measure('update', results, manager.update_mods())
+            results['installed'] = len(manager.get_manifest().load())
+
+            await measure('refresh_warm', results, manager.refresh_mods_info('bench', 'bench'))
+
+        results['peak_rss'] = get_peak_rss()
+        print(json.dumps(results))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f'The stand-in server did not start on {host}:{port}.')
+
+
+def get_free_port(host: str):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def format_row(result: dict):
+    def seconds(phase):
+        return f"{result[phase]['seconds']:>9.2f}s"
+
+    def size(value):
+        return f'{value / 1048576:>9.1f}M' if value is not None else f"{'n/a':>10}"
+
+    return f"{result['mods']:>6} {seconds('refresh_cold')} {seconds('update')} {seconds('refresh_warm')} " \
+           f"{size(result['peak_rss'])} {size(result['update'].get('bytes_written'))} " \
+           f"{result['resolved']:>8} {result['installed']:>9}"
+
+
+def compare(results: list, baseline_filename: str, tolerance: float):
+    with open(baseline_filename, 'r') as file:
+        baseline = {x['mods']: x for x in json.load(file)}
+
+    regressions = []
+    for result in results:
+        reference = baseline.get(result['mods'])
+        if reference is None:
+            continue
+        for phase in ('refresh_cold', 'update', 'refresh_warm'):
+            limit = reference[phase]['seconds'] * (1 + tolerance)
+            if result[phase]['seconds'] > limit:
+                regressions.append(f"{result['mods']} mods, {phase}: {result[phase]['seconds']:.2f}s "
+                                   f"> {limit:.2f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ModsManager against local stand-in provider servers.')
+    parser.add_argument('--mods', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--providers', default=','.join(PROVIDERS))
+    parser.add_argument('--latency', type=float, default=0.02, help='Delay added to every response, in seconds.')
+    parser.add_argument('--archive-size', type=int, default=262144, help='Size of each archive payload in bytes.')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Share of the requests answered with a 503.')
+    parser.add_argument('--bandwidth', type=int, default=0, help='Bytes per second of each archive connection.')
+    parser.add_argument('--max-concurrency', type=int, default=16)
+    parser.add_argument('--extract-processes', type=int, default=0)
+    parser.add_argument('--segments', type=int, default=0, help='Download each archive over this many ranges.')
+    parser.add_argument('--community', default=None, help='Resolve Thunderstore mods through the community index.')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep the default provider rate limits.')
+    parser.add_argument('--output', help='Write the results to a JSON file.')
+    parser.add_argument('--baseline', help='Fail when a phase is slower than in this JSON results file.')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.basicConfig(level=logging.CRITICAL)
+        args.mods = args.mods[0]
+        asyncio.run(run_child(args))
+        return 0
+
+    host = '127.0.0.1'
+    port = get_free_port(host)
+    here = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen([sys.executable, os.path.join(here, 'servers.py'), '--host', host, '--port', str(port),
+                               '--latency', str(args.latency), '--archive-size', str(args.archive_size),
+                               '--failure-rate', str(args.failure_rate), '--packages', str(max(args.mods)),
+                               '--bandwidth', str(args.bandwidth)])
+    results = []
+    try:
+        wait_for_port(host, port)
+        print(f"{'mods':>6} {'refresh':>10} {'update':>10} {'warm':>10} {'peak rss':>10} {'written':>10} "
+              f"{'resolved':>8} {'installed':>9}")
+
+        # Each size runs in its own process so the peak RSS and the caches are not shared between runs.
+        for mods in args.mods:
+            command = [sys.executable, os.path.abspath(__file__), '--child', '--url', f'http://{host}:{port}',
+                       '--mods', str(mods), '--providers', args.providers,
+                       '--max-concurrency', str(args.max_concurrency),
+                       '--extract-processes', str(args.extract_processes), '--segments', str(args.segments)]
+            if args.community:
+                command += ['--community', args.community]
+            if args.rate_limits:
+                command.append('--rate-limits')
+
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(here),
+                                                                            os.environ.get('PYTHONPATH')])))
+            output = subprocess.run(command, capture_output=True, text=True, check=True, env=env).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(format_row(result))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    # Every resolved archive must be installed, whatever the timings.
+    failures = [f"{x['mods']} mods: {x['installed']} of {x['expected']} installed" for x in results
+                if x['installed'] != x['expected']]
+    for failure in failures:
+        print(f'Failure: {failure}')
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        return 1 if regressions or failures else 0
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
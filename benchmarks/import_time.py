@@ -0,0 +1,44 @@
+import argparse
+import subprocess
+import sys
+
+FORBIDDEN_MODULES = ('steam', 'gevent', 'pandas', 'cerberus')
+
+
+def measure_import(module: str):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imported[name.strip()] = int(cumulative)
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the cold import time of a vapordmods module.')
+    parser.add_argument('--module', default='vapordmods.mods.modsmanager')
+    parser.add_argument('--budget-ms', type=float, default=500)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    best_ms = min(x[args.module] for x in runs) / 1000
+    forbidden = sorted(x for x in runs[0] if x.split('.')[0] in FORBIDDEN_MODULES)
+
+    print(f'{args.module}: {best_ms:.1f} ms (budget {args.budget_ms:.0f} ms)')
+    failed = False
+    if forbidden:
+        print(f'Heavy modules imported at load time: {", ".join(forbidden)}')
+        failed = True
+    if best_ms > args.budget_ms:
+        print('The import time budget is exceeded.')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import functools
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import zipfile
+from aiohttp import web
+
+WORKSHOP_APP_ID = 1
+MOD_VERSION = '1.0.0'
+_ZIP_DATE = (2022, 1, 1, 0, 0, 0)
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+# Stand-in for the Thunderstore, GitHub, Nexus Mods and Steam Workshop APIs and their archive downloads. Every
+# provider host is served under its own path prefix, e.g. http://127.0.0.1:8080/api.github.com/repos/...
+class StandInServer:
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0, archive_size: int = 1048576,
+                 failure_rate: float = 0, packages: int = 1000, seed: int = 0, bandwidth: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.bandwidth = bandwidth
+        self.packages = packages
+        self.random = random.Random(seed)
+        self.payload = random.Random(seed).getrandbits(archive_size * 8).to_bytes(archive_size, 'little') \
+            if archive_size else b''
+        self.requests = {}
+        self._runner = None
+        # Range requests ask for the same archive several times in a row.
+        self.make_archive = functools.lru_cache(maxsize=8)(self.make_archive)
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def make_app(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get('/thunderstore.io/api/experimental/package/{namespace}/{name}/', self.thunderstore_latest)
+        app.router.add_get('/thunderstore.io/api/experimental/package/{namespace}/{name}/{version}',
+                           self.thunderstore_version)
+        app.router.add_get('/thunderstore.io/c/{community}/api/v1/package/', self.thunderstore_community)
+        app.router.add_get('/gcdn.thunderstore.io/live/repository/packages/{filename}', self.archive)
+        app.router.add_get('/api.github.com/repos/{owner}/{repo}/releases', self.github_releases)
+        app.router.add_get('/api.github.com/repos/{owner}/{repo}/releases/latest', self.github_release)
+        app.router.add_get('/api.github.com/repos/{owner}/{repo}/releases/tags/{tag}', self.github_release)
+        app.router.add_get('/github.com/{owner}/{repo}/releases/download/{tag}/{filename}', self.github_asset)
+        app.router.add_get('/api.nexusmods.com/v1/games/{game}/mods/updated.json', self.nexusmods_updated)
+        app.router.add_get('/api.nexusmods.com/v1/games/{game}/mods/{mod_id}/files.json', self.nexusmods_files)
+        app.router.add_get('/api.nexusmods.com/v1/games/{game}/mods/{mod_id}/files/{file_id}/download_link.json',
+                           self.nexusmods_download_link)
+        app.router.add_get('/api.steampowered.com/IPublishedFileService/GetDetails/v1/', self.workshop_details)
+        app.router.add_get('/archives/{filename}', self.archive)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        host = request.path.split('/')[1]
+        self.requests[host] = self.requests.get(host, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            return web.Response(status=503, text='Stand-in failure')
+        return await handler(request)
+
+    @staticmethod
+    def _json(request: web.Request, data):
+        body = json.dumps(data).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type='application/json', headers={'ETag': etag})
+
+    def make_archive(self, name: str):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+            archive.writestr(zipfile.ZipInfo(f'{name}/manifest.json', _ZIP_DATE),
+                             json.dumps({'name': name, 'version_number': MOD_VERSION}))
+            archive.writestr(zipfile.ZipInfo(f'{name}/payload.bin', _ZIP_DATE), self.payload)
+        return buffer.getvalue()
+
+    def _thunderstore_package(self, namespace: str, name: str, version: str = MOD_VERSION):
+        return {'version_number': version, 'full_name': f'{namespace}-{name}-{version}',
+                'description': f'Stand-in package {name}', 'file_size': len(self.payload)}
+
+    async def thunderstore_latest(self, request: web.Request):
+        info = request.match_info
+        return self._json(request, {'latest': self._thunderstore_package(info['namespace'], info['name'])})
+
+    async def thunderstore_version(self, request: web.Request):
+        info = request.match_info
+        return self._json(request, self._thunderstore_package(info['namespace'], info['name'], info['version']))
+
+    async def thunderstore_community(self, request: web.Request):
+        packages = [{'full_name': f'bench-Mod{i}', 'date_updated': MOD_VERSION,
+                     'versions': [self._thunderstore_package('bench', f'Mod{i}')]} for i in range(self.packages)]
+        return self._json(request, packages)
+
+    def _github_release(self, owner: str, repo: str):
+        # Like on GitHub, the assets of every repository share the same name.
+        url = f'{self.url}/github.com/{owner}/{repo}/releases/download/{MOD_VERSION}/mod.zip'
+        return {'tag_name': MOD_VERSION, 'draft': False, 'body': 'x' * 2048,
+                'assets': [{'name': 'mod.zip', 'size': len(self.payload), 'browser_download_url': url}]}
+
+    async def github_releases(self, request: web.Request):
+        info = request.match_info
+        releases = [self._github_release(info['owner'], info['repo'])] if request.query.get('page', '1') == '1' else []
+        return self._json(request, releases)
+
+    async def github_release(self, request: web.Request):
+        info = request.match_info
+        if info.get('tag', MOD_VERSION) != MOD_VERSION:
+            return web.json_response({'message': 'Not Found'}, status=404)
+        return self._json(request, self._github_release(info['owner'], info['repo']))
+
+    async def nexusmods_updated(self, request: web.Request):
+        # The stand-in mods never change after their first release.
+        return self._json(request, [])
+
+    async def nexusmods_files(self, request: web.Request):
+        return self._json(request, {'files': [{'file_id': 1, 'version': MOD_VERSION, 'name': 'mod',
+                                               'size_in_bytes': len(self.payload)}]})
+
+    async def nexusmods_download_link(self, request: web.Request):
+        info = request.match_info
+        return self._json(request, [{'name': 'Stand-in CDN',
+                                     'URI': f"{self.url}/archives/nexusmods-{info['game']}-{info['mod_id']}.zip"}])
+
+    async def workshop_details(self, request: web.Request):
+        ids = [v for k, v in request.query.items() if k.startswith('publishedfileids[')]
+        details = [{'publishedfileid': x, 'result': 1, 'consumer_appid': WORKSHOP_APP_ID, 'title': f'Item {x}',
+                    'file_description': '', 'time_updated': 1640995200, 'file_size': len(self.payload)} for x in ids]
+        return self._json(request, {'response': {'publishedfiledetails': details}})
+
+    async def github_asset(self, request: web.Request):
+        info = request.match_info
+        return await self._archive(request, f"github-{info['owner']}-{info['repo']}")
+
+    async def archive(self, request: web.Request):
+        return await self._archive(request, os.path.splitext(request.match_info['filename'])[0])
+
+    async def _archive(self, request: web.Request, name: str):
+        body = self.make_archive(name)
+        headers = {'Accept-Ranges': 'bytes', 'ETag': '"' + hashlib.sha1(body).hexdigest() + '"'}
+
+        match = _RANGE_PATTERN.match(request.headers.get('Range', ''))
+        if_range = request.headers.get('If-Range')
+        if match is None or (if_range is not None and if_range != headers['ETag']):
+            return await self._send(request, 200, body, headers)
+
+        start, end = match.groups()
+        if not start:
+            start, end = len(body) - int(end), len(body) - 1
+        start, end = int(start), min(int(end) if end else len(body) - 1, len(body) - 1)
+        if start >= len(body) or start > end:
+            return web.Response(status=416, headers={'Content-Range': f'bytes */{len(body)}'})
+        headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+        return await self._send(request, 206, body[start:end + 1], headers)
+
+    async def _send(self, request: web.Request, status: int, body: bytes, headers: dict):
+        if not self.bandwidth:
+            return web.Response(status=status, body=body, content_type='application/zip', headers=headers)
+
+        # Every connection is throttled on its own, like a link where a single stream cannot use all the bandwidth.
+        resp = web.StreamResponse(status=status, headers=headers)
+        resp.content_type = 'application/zip'
+        resp.content_length = len(body)
+        await resp.prepare(request)
+        chunk_size = max(self.bandwidth // 10, 1)
+        for start in range(0, len(body), chunk_size):
+            await resp.write(body[start:start + chunk_size])
+            await asyncio.sleep(min(chunk_size, len(body) - start) / self.bandwidth)
+        await resp.write_eof()
+        return resp
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the stand-in provider servers used by the benchmarks.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help='Delay added to every response, in seconds.')
+    parser.add_argument('--archive-size', type=int, default=1048576, help='Size of the archive payload in bytes.')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Share of the requests answered with a 503.')
+    parser.add_argument('--packages', type=int, default=1000, help='Packages listed by the Thunderstore community.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bandwidth', type=int, default=0, help='Bytes per second of each archive download.')
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, args.latency, args.archive_size, args.failure_rate, args.packages,
+                           args.seed, args.bandwidth)
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,7 +19,6 @@ setup(
     install_requires=['PyYAML~=6.0',
                       'aiohttp~=3.8.1',
                       'aiofiles~=0.8.0',
-                      'pandas~=1.4.2',
                       'cerberus~=1.3.4'],
     python_requires=">=3.8",
     license='MIT',
@@ -1,9 +1,23 @@
+import asyncio
+import aiohttp
+import contextlib
+import logging
 from abc import ABC, abstractmethod
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.ratelimit import RateLimits
+from vapordmods.api.session import API_TIMEOUT
+
+api_logger = logging.getLogger(__name__)
 
 
 class BaseApi(ABC):
+    _API_HOST = None
 
-    def __init__(self):
+    def __init__(self, session: aiohttp.ClientSession = None, cache: ResponseCache = None,
+                 limits: RateLimits = None):
+        self.session = session
+        self.cache = cache
+        self.limiter = limits.get(self._API_HOST) if limits is not None else None
         self.provider = None
         self.app = None
         self.mods = None
@@ -13,6 +27,65 @@ class BaseApi(ABC):
         self.title = None
         self.description = None
         self.download_url = None
+        self.size = None
+
+    def _request(self, method: str, url: str, **kwargs):
+        if self.session is not None and not self.session.closed:
+            return self.session.request(method, url, **kwargs)
+        return aiohttp.request(method, url, timeout=API_TIMEOUT, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def _fetch(self, method: str, url: str, **kwargs):
+        if self.limiter is None:
+            async with self._request(method, url, **kwargs) as resp:
+                yield resp
+            return
+
+        for attempt in range(self.limiter.retries + 1):
+            await self.limiter.acquire()
+            async with self._request(method, url, **kwargs) as resp:
+                delay = self.limiter.update(resp.status, resp.headers, attempt)
+                if delay is None or attempt == self.limiter.retries or delay > self.limiter.max_wait:
+                    yield resp
+                    return
+
+            self.limiter.retried += 1
+            api_logger.debug(f'{self._API_HOST}: Status {resp.status}, retrying in {delay:.1f} seconds.')
+            await asyncio.sleep(delay)
+
+    @classmethod
+    async def prefetch(cls, rows: list, api_key: str = None, session: aiohttp.ClientSession = None,
+                       limits: RateLimits = None, cache: ResponseCache = None, bound=None) -> dict:
+        return {}
+
+    @staticmethod
+    async def _unbound(host: str, coro):
+        return await coro
+
+    async def _get_json(self, url: str, headers: dict = None, params: dict = None):
+        headers = dict(headers or {})
+        key = entry = None
+        if self.cache is not None:
+            key = self.cache.make_key(url, params)
+            entry = await self.cache.get(key)
+            if self.cache.is_fresh(entry):
+                self.cache.stats['hit'] += 1
+                return 200, entry['body']
+            headers.update(self.cache.get_validators(entry))
+
+        async with self._fetch('GET', url, headers=headers, params=params) as resp:
+            if resp.status == 304 and entry is not None:
+                self.cache.stats['revalidated'] += 1
+                await self.cache.touch(key, entry)
+                return 200, entry['body']
+            elif resp.status == 200:
+                body = await resp.json()
+                if self.cache is not None:
+                    self.cache.stats['miss'] += 1
+                    await self.cache.put(key, body, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+                return resp.status, body
+            else:
+                return resp.status, await resp.text()
 
     @abstractmethod
     async def get_update(self, **kwargs) -> int:
@@ -27,5 +100,6 @@ class BaseApi(ABC):
                 'full_mods_name': self.full_mods_name,
                 'title': self.title,
                 'description': self.description,
-                'download_url': self.download_url
+                'download_url': self.download_url,
+                'size': self.size
                 }
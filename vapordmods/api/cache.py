@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+
+    def __init__(self, cache_dir: str, ttl: float = 300, max_size: int = 67108864):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self._size = None
+        self.stats = {'hit': 0, 'revalidated': 0, 'miss': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url: str, params: dict = None):
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in sorted(params.items()))
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def is_fresh(self, entry: dict):
+        return entry is not None and time.time() - entry['stored_at'] < self.ttl
+
+    @staticmethod
+    def get_validators(entry: dict):
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    async def get(self, key: str):
+        try:
+            async with aiofiles.open(self._path(key), 'r') as file:
+                return json.loads(await file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as er:
+            logger.debug(f'Cannot read the cache entry {key}: {er}')
+            return None
+
+    async def put(self, key: str, body, etag: str = None, last_modified: str = None):
+        entry = {'stored_at': time.time(), 'etag': etag, 'last_modified': last_modified, 'body': body}
+        data = json.dumps(entry)
+        path = self._path(key)
+        # Concurrent requests of the same url each write their own temporary file, the last one replaces the entry.
+        fd, tmp_path = tempfile.mkstemp(prefix=key + '.', suffix='.tmp', dir=self.cache_dir)
+        os.close(fd)
+        try:
+            async with aiofiles.open(tmp_path, 'w') as file:
+                await file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        if self._size is not None:
+            self._size += len(data)
+        self.evict()
+        return entry
+
+    async def touch(self, key: str, entry: dict):
+        return await self.put(key, entry['body'], entry.get('etag'), entry.get('last_modified'))
+
+    def evict(self):
+        if self._size is not None and self._size <= self.max_size:
+            return
+
+        entries = []
+        for item in os.scandir(self.cache_dir):
+            if item.is_file() and item.name.endswith('.json'):
+                stat = item.stat()
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+
+        self._size = sum(x[1] for x in entries)
+        # Least recently stored entries go first.
+        for mtime, size, path in sorted(entries):
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
@@ -1,53 +1,119 @@
+import asyncio
 import aiohttp
 import logging
 from vapordmods.api.base import BaseApi
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.ratelimit import RateLimits
 
 api_logger = logging.getLogger(__name__)
 
 
 class github(BaseApi):
+    _API_HOST = 'api.github.com'
     _GITHUB_API_RELEASE = 'https://api.github.com/repos/{}/{}/releases'
+    _GITHUB_API_RELEASE_LATEST = 'https://api.github.com/repos/{}/{}/releases/latest'
+    _GITHUB_API_RELEASE_TAG = 'https://api.github.com/repos/{}/{}/releases/tags/{}'
+    _GITHUB_PER_PAGE = 100
+    _GITHUB_HEADERS = {'Accept': 'application/vnd.github.v3+json'}
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: aiohttp.ClientSession = None, cache: ResponseCache = None,
+                 limits: RateLimits = None, releases: dict = None):
+        super().__init__(session, cache, limits)
+        self.releases = releases
+
+    @staticmethod
+    def make_release_key(owner: str, repo: str, version: str = None):
+        return str(owner).lower(), str(repo).lower(), str(version) if version else ''
+
+    @staticmethod
+    def __index_release(release: dict):
+        # Only the fields used to resolve a mod are kept, the release notes can be large.
+        return {'tag_name': release['tag_name'],
+                'assets': {x['name'].lower(): (x['browser_download_url'], x.get('size')) for x in release['assets']}}
+
+    async def __search_releases(self, owner: str, repo: str, version: str = None):
+        page = 1
+        while True:
+            params = {'per_page': self._GITHUB_PER_PAGE, 'page': page}
+            status, j = await self._get_json(self._GITHUB_API_RELEASE.format(owner, repo),
+                                             headers=self._GITHUB_HEADERS, params=params)
+            if status != 200:
+                api_logger.error(f'{owner}-{repo}: Status {status}, Error: {j}')
+                return None
+
+            for release in j:
+                if not release.get('draft') and (not version or release['tag_name'] == str(version)):
+                    return self.__index_release(release)
+
+            if len(j) < self._GITHUB_PER_PAGE:
+                return None
+            page += 1
+
+    async def find_release(self, owner: str, repo: str, version: str = None):
+        if not version:
+            request = self._GITHUB_API_RELEASE_LATEST.format(owner, repo)
+        else:
+            request = self._GITHUB_API_RELEASE_TAG.format(owner, repo, version)
+
+        status, j = await self._get_json(request, headers=self._GITHUB_HEADERS)
+        if status == 200:
+            return self.__index_release(j)
+        elif status != 404:
+            api_logger.error(f'{owner}-{repo}: Status {status}, Error: {j}')
+            return None
+
+        # releases/latest ignores the prereleases and releases/tags the releases named differently than their tag.
+        api_logger.debug(f'{owner}-{repo}: The release {version or "latest"} was not found, searching the releases.')
+        return await self.__search_releases(owner, repo, version)
+
+    @classmethod
+    async def prefetch(cls, rows: list, api_key: str = None, session: aiohttp.ClientSession = None,
+                       limits: RateLimits = None, cache: ResponseCache = None, bound=None) -> dict:
+        if not rows:
+            return {}
+
+        # Mods sharing a repository and a version are resolved with a single release lookup.
+        bound = bound or cls._unbound
+        apicall = cls(session, cache, limits)
+        keys = list(dict.fromkeys(cls.make_release_key(x['app'], x['mods'], x['version']) for x in rows))
+        releases = await asyncio.gather(*[bound(cls._API_HOST, apicall.find_release(*x)) for x in keys],
+                                        return_exceptions=True)
+
+        prefetched = {}
+        for key, release in zip(keys, releases):
+            # A failed lookup is left out, get_update retries it on its own.
+            if isinstance(release, BaseException):
+                api_logger.warning(f'{key[0]}-{key[1]}: The release lookup failed: {release!r}')
+            else:
+                prefetched[key] = release
+        return {'releases': prefetched}
 
     async def get_update(self, owner: str, repo: str, mods_dir: str, filename: str, version: str = None) -> int:
+        key = self.make_release_key(owner, repo, version)
+        if self.releases is not None and key in self.releases:
+            release = self.releases[key]
+        else:
+            release = await self.find_release(owner, repo, version)
+
+        if release is None:
+            api_logger.error(f'{owner}-{repo}: No release found for version: {version}')
+            return 1
+
+        asset = release['assets'].get(filename.lower())
+        if asset is None:
+            api_logger.error(f'{owner}-{repo}: No filename found for version: {filename}')
+            return 1
+
+        self.version = release['tag_name']
+        self.description = ''
+        self.provider = 'github'
+        self.app = owner
+        self.mods = repo
+        self.title = repo
+        self.mods_dir = mods_dir
+        self.full_mods_name = owner + '-' + repo
+        self.download_url, self.size = asset
 
-        payload = {'Accept': 'application/vnd.github.v3+json'}
-        request = self._GITHUB_API_RELEASE.format(owner, repo)
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(request, params=payload) as resp:
-                if resp.status == 200:
-                    j = await resp.json()
-                    release = []
-                    if not version:
-                        release = j[0]
-                    else:
-                        release = [x for x in j if x['tag_name'] == version]
-
-                    if not len(release):
-                        api_logger.error(f'{owner}-{repo}: No release found for version: {version}')
-                        return 1
-
-                    assets = [x for x in release['assets'] if x['name'].lower() == filename.lower()]
-                    if not len(assets):
-                        api_logger.error(f'{owner}-{repo}: No filename found for version: {filename}')
-                        return 1
-
-                    self.version = release['tag_name']
-                    self.description = ''
-                    self.provider = 'github'
-                    self.app = owner
-                    self.mods = repo
-                    self.title = repo
-                    self.mods_dir = mods_dir
-                    self.full_mods_name = owner + '-' + repo
-                    self.download_url = assets[0]['browser_download_url']
-
-                    api_logger.debug(
-                        f'The request from the "Thunderstore" API was successfull for the namespace {owner} and the mod {repo}')
-                    return 0
-                else:
-                    api_logger.error(f'{owner}-{repo}: Status {resp.status}, Error: {await resp.text()}')
-                    return 1
+        api_logger.debug(
+            f'The request from the "GitHub" API was successfull for the owner {owner} and the repository {repo}')
+        return 0
@@ -1,59 +1,100 @@
 import aiohttp
 import logging
+import time
 
 from vapordmods.api.base import BaseApi
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.ratelimit import RateLimits
 
 api_logger = logging.getLogger(__name__)
 
 
 class nexusmods(BaseApi):
+    _API_HOST = 'api.nexusmods.com'
     _NEXUSMODS_API_URL_FILES = "https://api.nexusmods.com/v1/games/{}/mods/{}/files.json"
     _NEXUSMODS_API_URL_DOWNLOAD_LINK = "https://api.nexusmods.com/v1/games/{}/mods/{}/files/{}/download_link.json"
+    _NEXUSMODS_API_URL_UPDATED = "https://api.nexusmods.com/v1/games/{}/mods/updated.json"
+    _NEXUSMODS_UPDATED_PERIODS = (('1d', 86400), ('1w', 604800), ('1m', 2592000))
+    _NEXUSMODS_UPDATED_MARGIN = 300
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: aiohttp.ClientSession = None, cache: ResponseCache = None,
+                 limits: RateLimits = None):
+        super().__init__(session, cache, limits)
+
+    @staticmethod
+    def __get_headers(api_key: str):
+        return {
+            "accept": "application/json",
+            "apikey": api_key
+        }
 
     @staticmethod
     def __get_file_data(version, response):
-        filedata = {}
+        if not response.get('files'):
+            return None
+
         if not version:
-            filedata = response['files'][len(response['files']) - 1]
-        else:
-            filedata = [i for i in response['files'] if i['version'] == version]
-            if len(filedata) == 0:
+            return response['files'][len(response['files']) - 1]
+
+        filedata = [i for i in response['files'] if i['version'] == str(version)]
+        if len(filedata) == 0:
+            return None
+        return filedata[0]
+
+    async def get_updated_mods(self, game_domain_name: str, since: float, api_key: str):
+        # The feed only covers fixed periods, a longer absence needs a lookup of every mod.
+        elapsed = time.time() - since + self._NEXUSMODS_UPDATED_MARGIN
+        period = next((name for name, seconds in self._NEXUSMODS_UPDATED_PERIODS if elapsed <= seconds), None)
+        if period is None:
+            return None
+
+        request = self._NEXUSMODS_API_URL_UPDATED.format(game_domain_name)
+        status, j = await self._get_json(request, headers=self.__get_headers(api_key), params={'period': period})
+        if status != 200:
+            api_logger.error(f'{game_domain_name}: Status {status}, Error: {j}')
+            return None
+
+        return {str(x['mod_id']) for x in j if x['latest_file_update'] >= since - self._NEXUSMODS_UPDATED_MARGIN}
+
+    async def get_download_link(self, download_link_url: str, api_key: str):
+        # Download links expire and count against the quota, so they are only requested to install a mod.
+        async with self._fetch('GET', download_link_url, headers=self.__get_headers(api_key)) as resp:
+            if resp.status != 200:
+                api_logger.error(f'Status {resp.status}, Error: {await resp.text()}')
                 return None
-            else:
-                filedata = filedata[0]
-        return filedata
+            dl = await resp.json()
+        return dl[0]['URI'] if dl else None
 
     async def get_update(self, game_domain_name: str, mod_id: str, mods_dir: str, version: str = None, api_key: str = None) -> int:
         if not api_key:
             api_logger.error(f'{game_domain_name}-{mod_id}: The nmods_api_key is null or empty and cannot get an '
                              f'update for the mod. Please provide a valid api key.')
             return 1
-        else:
-            request = self._NEXUSMODS_API_URL_FILES.format(game_domain_name, mod_id)
-            headers = {
-                "accept": "application/json",
-                "apikey": api_key
-            }
-            filedata = {}
-            async with aiohttp.request('GET', request, headers=headers) as resp:
-                if resp.status == 200:
-                    j = await resp.json()
-
-                    filedata = self.__get_file_data(version, j)
-                    if filedata is None:
-                        api_logger.error(
-                            f"status': {resp.status}, 'data': The version '{version}' was not found in the game domain '{game_domain_name}' for the mod '{mod_id}'.")
-
-                    req_dl = self._NEXUSMODS_API_URL_DOWNLOAD_LINK.format(game_domain_name, mod_id, str(filedata['file_id']))
-                    async with aiohttp.request('GET', req_dl, headers=headers) as resp_dl:
-                        if resp_dl.status == 200:
-                            dl = await resp_dl.json()
-                            self.app = game_domain_name
-                            self.mods = mod_id
-                            self.version = filedata['version']
-                            self.download_url = dl[0]['URI']
-                            return 0
+
+        request = self._NEXUSMODS_API_URL_FILES.format(game_domain_name, mod_id)
+        status, j = await self._get_json(request, headers=self.__get_headers(api_key))
+        if status != 200:
+            api_logger.error(f'{game_domain_name}-{mod_id}: Status {status}, Error: {j}')
+            return 1
+
+        filedata = self.__get_file_data(version, j)
+        if filedata is None:
+            api_logger.error(
+                f"status': {status}, 'data': The version '{version}' was not found in the game domain '{game_domain_name}' for the mod '{mod_id}'.")
             return 1
+
+        self.provider = 'nexusmods'
+        self.app = game_domain_name
+        self.mods = mod_id
+        self.mods_dir = mods_dir
+        self.version = filedata['version']
+        self.full_mods_name = f'{game_domain_name}-{mod_id}'
+        self.title = filedata.get('name')
+        self.description = filedata.get('description')
+        self.size = filedata.get('size_in_bytes')
+        self.download_url = self._NEXUSMODS_API_URL_DOWNLOAD_LINK.format(game_domain_name, mod_id,
+                                                                         str(filedata['file_id']))
+
+        api_logger.debug(
+            f'The request from the "Nexusmods" API was successfull for the game {game_domain_name} and the mod {mod_id}')
+        return 0
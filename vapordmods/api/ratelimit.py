@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class RateLimiter:
+    _RETRY_STATUS = (429, 403)
+
+    def __init__(self, host: str, rate: float = None, burst: int = 1, retries: int = 4, backoff: float = 1,
+                 max_wait: float = 60):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.retried = 0
+        self._lock = None
+
+    @staticmethod
+    def _parse_reset(value: str):
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S %z').timestamp()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_retry_after(value: str):
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+    def _read_budget(self, headers):
+        # GitHub: X-RateLimit-*, Nexus Mods: x-rl-hourly-* and x-rl-daily-*.
+        if 'X-RateLimit-Remaining' in headers:
+            return (headers.get('X-RateLimit-Limit'), int(headers['X-RateLimit-Remaining']),
+                    self._parse_reset(headers.get('X-RateLimit-Reset')))
+
+        budgets = []
+        for period in ('daily', 'hourly'):
+            if f'x-rl-{period}-remaining' in headers:
+                budgets.append((headers.get(f'x-rl-{period}-limit'), int(headers[f'x-rl-{period}-remaining']),
+                                self._parse_reset(headers.get(f'x-rl-{period}-reset'))))
+        if not budgets:
+            return None
+        # Nexus Mods still allows the hourly requests once the daily budget is spent, so the largest budget is used
+        # and the earliest reset when both are spent.
+        return max(budgets, key=lambda x: (x[1], -(x[2] or float('inf'))))
+
+    def update(self, status: int, headers, attempt: int = 0) -> float:
+        budget = self._read_budget(headers)
+        if budget is not None:
+            limit, self.remaining, self.reset_at = budget
+            self.limit = int(limit) if limit is not None else self.limit
+            if self.limit and self.remaining < self.limit * 0.1:
+                logger.warning(f'{self.host}: Only {self.remaining} of {self.limit} requests left until the rate '
+                               f'limit reset.')
+
+        if status not in self._RETRY_STATUS:
+            return None
+
+        delay = self._parse_retry_after(headers.get('Retry-After'))
+        if delay is None and self.remaining == 0 and self.reset_at is not None:
+            delay = max(self.reset_at - time.time(), 0)
+        if delay is None:
+            if status == 403:
+                # A 403 without any rate limit signal is a real authorization error.
+                return None
+            # Based on the attempt of this request, retried only counts the retries of the host for get_status.
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+        return delay
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self.remaining is not None and self.remaining <= 0 and self.reset_at is not None:
+                wait = self.reset_at - time.time()
+                if wait > self.max_wait:
+                    raise RateLimitError(f'{self.host}: The rate limit is exhausted for {int(wait)} seconds.')
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.remaining = None
+
+            if self.rate:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= 1
+
+            # Counted locally so concurrent requests don't overshoot the budget before the next response.
+            if self.remaining is not None:
+                self.remaining -= 1
+
+    def get_status(self):
+        return {'limit': self.limit, 'remaining': self.remaining, 'reset_at': self.reset_at, 'retried': self.retried}
+
+
+class RateLimits:
+    _DEFAULTS = {
+        'api.nexusmods.com': {'rate': 5, 'burst': 10},
+        'api.github.com': {'rate': 5, 'burst': 10},
+        'api.steampowered.com': {'rate': 10, 'burst': 20},
+    }
+
+    def __init__(self, options: dict = None):
+        self.options = dict(self._DEFAULTS, **(options or {}))
+        self.limiters = {}
+
+    def get(self, host: str):
+        if host not in self.limiters:
+            self.limiters[host] = RateLimiter(host, **self.options.get(host, {}))
+        return self.limiters[host]
+
+    def get_status(self):
+        return {host: x.get_status() for host, x in self.limiters.items()}
@@ -0,0 +1,19 @@
+import aiohttp
+
+# A stalled connection fails after sock_read seconds without data. API requests also have a total timeout, downloads
+# of large archives only the socket timeouts.
+API_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=30, sock_read=30)
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+
+
+def create_session(limit: int = 64,
+                   limit_per_host: int = 8,
+                   ttl_dns_cache: int = 300,
+                   keepalive_timeout: float = 30,
+                   timeout: aiohttp.ClientTimeout = API_TIMEOUT) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(limit=limit,
+                                     limit_per_host=limit_per_host,
+                                     ttl_dns_cache=ttl_dns_cache,
+                                     use_dns_cache=True,
+                                     keepalive_timeout=keepalive_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
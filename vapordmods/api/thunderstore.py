@@ -1,48 +1,63 @@
 import aiohttp
 import logging
+from typing import TYPE_CHECKING
 from vapordmods.api.base import BaseApi
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.ratelimit import RateLimits
+
+if TYPE_CHECKING:
+    from vapordmods.api.thunderstore_index import ThunderstoreIndex
 
 api_logger = logging.getLogger(__name__)
 
 
 class thunderstore(BaseApi):
+    _API_HOST = 'thunderstore.io'
 
     _THUNDERSTORE_API_URL_LATEST = 'https://thunderstore.io/api/experimental/package/{}/{}/'
     _THUNDERSTORE_API_URL_VERSION = 'https://thunderstore.io/api/experimental/package/{}/{}/{}'
     _THUNDERSTORE_DOWNLOAD_LINK = 'https://gcdn.thunderstore.io/live/repository/packages/{}'
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: aiohttp.ClientSession = None, cache: ResponseCache = None,
+                 limits: RateLimits = None, index: 'ThunderstoreIndex' = None):
+        super().__init__(session, cache, limits)
+        self.index = index
+
+    def __set_data(self, namespace: str, name: str, mods_dir: str, version: str, description: str, full_name: str,
+                   size: int = None):
+        self.version = version
+        self.description = description
+        self.provider = 'thunderstore'
+        self.app = namespace
+        self.mods = name
+        self.title = name
+        self.mods_dir = mods_dir
+        self.full_mods_name = namespace + '-' + name
+        self.download_url = self._THUNDERSTORE_DOWNLOAD_LINK.format(full_name + '.zip')
+        self.size = size
 
     async def get_update(self, namespace: str, name: str, mods_dir: str, version: str = None, api_key: str = None) -> int:
+        if self.index is not None:
+            package = self.index.lookup(namespace, name, version)
+            if package is not None:
+                self.__set_data(namespace, name, mods_dir, package['version_number'], package['description'],
+                                package['full_name'], package['file_size'])
+                api_logger.debug(f'The namespace {namespace} and the mod {name} was resolved from the index.')
+                return 0
+
         if not version:
             request = self._THUNDERSTORE_API_URL_LATEST.format(namespace, name)
         else:
             request = self._THUNDERSTORE_API_URL_VERSION.format(namespace, name, version)
 
-        async with aiohttp.request('GET', request) as resp:
-            if resp.status == 200:
-                j = await resp.json()
-                if not version:
-                    self.version = j['latest']['version_number']
-                    self.description = j['latest']['description']
-                    download_url = j['latest']['full_name'] + '.zip'
-                else:
-                    self.version = j['version_number']
-                    self.description = j['description']
-                    download_url = j['full_name'] + '.zip'
-
-                self.provider = 'thunderstore'
-                self.app = namespace
-                self.mods = name
-                self.title = name
-                self.mods_dir = mods_dir
-                self.full_mods_name = namespace + '-' + name
-
-                self.download_url = self._THUNDERSTORE_DOWNLOAD_LINK.format(download_url)
-                api_logger.debug(
-                    f'The request from the "Thunderstore" API was successfull for the namespace {namespace} and the mod {name}')
-                return 0
-            else:
-                api_logger.error(f'{namespace}-{name}: Status {resp.status}, Error: {await resp.text()}')
-                return 1
+        status, j = await self._get_json(request)
+        if status == 200:
+            package = j['latest'] if not version else j
+            self.__set_data(namespace, name, mods_dir, package['version_number'], package['description'],
+                            package['full_name'], package.get('file_size'))
+            api_logger.debug(
+                f'The request from the "Thunderstore" API was successfull for the namespace {namespace} and the mod {name}')
+            return 0
+        else:
+            api_logger.error(f'{namespace}-{name}: Status {status}, Error: {j}')
+            return 1
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import aiohttp
+from vapordmods.api.session import DOWNLOAD_TIMEOUT
+
+api_logger = logging.getLogger(__name__)
+
+
+class ThunderstoreIndex:
+    _API_HOST = 'thunderstore.io'
+    _THUNDERSTORE_API_URL_COMMUNITY = 'https://thunderstore.io/c/{}/api/v1/package/'
+
+    def __init__(self, index_dir: str, community: str, max_age: float = 300):
+        self.community = community
+        self.max_age = max_age
+        os.makedirs(index_dir, exist_ok=True)
+        self.filename = os.path.join(index_dir, f'thunderstore_{community}.sqlite')
+        self._lock = None
+        # False after a failed refresh, the mods are then resolved through the package API.
+        self.available = True
+
+        self.db = sqlite3.connect(self.filename, check_same_thread=False)
+        with self.db:
+            columns = [x[1] for x in self.db.execute('PRAGMA table_info(versions)')]
+            if columns and 'file_size' not in columns:
+                # Indexes built before the file sizes were stored are rebuilt by the next full refresh.
+                self.db.execute('DROP TABLE versions')
+                self.db.execute('DROP TABLE IF EXISTS packages')
+                self.db.execute('DROP TABLE IF EXISTS meta')
+            self.db.execute('CREATE TABLE IF NOT EXISTS packages ('
+                            'full_name TEXT PRIMARY KEY, date_updated TEXT, latest TEXT)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS versions ('
+                            'package TEXT, version_number TEXT, full_name TEXT, description TEXT, file_size INTEGER, '
+                            'PRIMARY KEY (package, version_number))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def close(self):
+        self.db.close()
+
+    def _get_meta(self, key: str):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def _apply(self, packages: list, etag: str, last_modified: str):
+        known = dict(self.db.execute('SELECT full_name, date_updated FROM packages'))
+        changed = 0
+        with self.db:
+            for package in packages:
+                full_name = package['full_name']
+                if known.pop(full_name, None) == package['date_updated'] or not package['versions']:
+                    continue
+
+                changed += 1
+                self.db.execute('DELETE FROM versions WHERE package = ?', (full_name,))
+                self.db.executemany('INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?)',
+                                    [(full_name, x['version_number'], x['full_name'], x['description'],
+                                      x.get('file_size')) for x in package['versions']])
+                self.db.execute('INSERT OR REPLACE INTO packages VALUES (?, ?, ?)',
+                                (full_name, package['date_updated'], package['versions'][0]['version_number']))
+
+            # Anything left in known was removed from the community.
+            for full_name in known:
+                self.db.execute('DELETE FROM versions WHERE package = ?', (full_name,))
+                self.db.execute('DELETE FROM packages WHERE full_name = ?', (full_name,))
+
+            self._set_meta('etag', etag)
+            self._set_meta('last_modified', last_modified)
+            self._set_meta('refreshed_at', str(time.time()))
+        return changed
+
+    def _touch(self):
+        with self.db:
+            self._set_meta('refreshed_at', str(time.time()))
+
+    async def __refresh(self, session: aiohttp.ClientSession, force: bool = False) -> int:
+        refreshed_at = self._get_meta('refreshed_at')
+        if not force and refreshed_at and time.time() - float(refreshed_at) < self.max_age:
+            return 0
+
+        headers = {}
+        if self._get_meta('etag'):
+            headers['If-None-Match'] = self._get_meta('etag')
+        if self._get_meta('last_modified'):
+            headers['If-Modified-Since'] = self._get_meta('last_modified')
+
+        request = self._THUNDERSTORE_API_URL_COMMUNITY.format(self.community)
+        # The community listing can be tens of megabytes, only a stalled connection times out.
+        async with session.get(request, headers=headers, timeout=DOWNLOAD_TIMEOUT) as resp:
+            if resp.status == 304:
+                self._touch()
+                api_logger.debug(f'The Thunderstore index for {self.community} is up to date.')
+                return 0
+            elif resp.status != 200:
+                api_logger.error(f'{self.community}: Status {resp.status}, Error: {await resp.text()}')
+                return 1
+
+            packages = await resp.json()
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+
+        loop = asyncio.get_running_loop()
+        changed = await loop.run_in_executor(None, self._apply, packages, etag, last_modified)
+        api_logger.debug(f'The Thunderstore index for {self.community} was refreshed, {changed} packages changed.')
+        return 0
+
+    async def refresh(self, session: aiohttp.ClientSession, force: bool = False) -> int:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            try:
+                result = await self.__refresh(session, force)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, sqlite3.Error) as er:
+                api_logger.error(f'The Thunderstore index for {self.community} cannot be refreshed: {er}')
+                result = 1
+
+            self.available = result == 0
+            if not self.available:
+                api_logger.warning(f'The Thunderstore mods of {self.community} are resolved through the package API.')
+            return result
+
+    def lookup(self, namespace: str, name: str, version: str = None):
+        if not self.available:
+            return None
+
+        package = f'{namespace}-{name}'
+        if not version:
+            row = self.db.execute('SELECT v.version_number, v.full_name, v.description, v.file_size FROM packages p '
+                                  'JOIN versions v ON v.package = p.full_name AND v.version_number = p.latest '
+                                  'WHERE p.full_name = ?', (package,)).fetchone()
+        else:
+            row = self.db.execute('SELECT version_number, full_name, description, file_size FROM versions '
+                                  'WHERE package = ? AND version_number = ?', (package, version)).fetchone()
+
+        if row is None:
+            return None
+        return {'version_number': row[0], 'full_name': row[1], 'description': row[2], 'file_size': row[3]}
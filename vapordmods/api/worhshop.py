@@ -2,40 +2,89 @@ import aiohttp
 import logging
 
 from vapordmods.api.base import BaseApi
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.ratelimit import RateLimits
 
 api_logger = logging.getLogger(__name__)
 
 
 class workshop(BaseApi):
+    _API_HOST = 'api.steampowered.com'
 
-    _WORKSHOP_API_LATEST_INFO = 'https://api.steampowered.com/IPublishedFileService/GetDetails/v1/?key={}&publishedfileids%5B0%5D={}&includemetadata=true&appid={}'
+    _WORKSHOP_API_DETAILS = 'https://api.steampowered.com/IPublishedFileService/GetDetails/v1/'
+    _WORKSHOP_BATCH_SIZE = 100
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: aiohttp.ClientSession = None, cache: ResponseCache = None,
+                 limits: RateLimits = None, details: dict = None):
+        super().__init__(session, cache, limits)
+        self.details = details
+
+    async def get_details(self, published_file_ids: list, api_key: str) -> dict:
+        details = {}
+        ids = list(dict.fromkeys(str(x) for x in published_file_ids))
+        for start in range(0, len(ids), self._WORKSHOP_BATCH_SIZE):
+            chunk = ids[start:start + self._WORKSHOP_BATCH_SIZE]
+            params = [('key', api_key), ('includemetadata', 'true')]
+            params += [(f'publishedfileids[{idx}]', x) for idx, x in enumerate(chunk)]
+
+            api_logger.debug(f'Start API request GetDetails for {len(chunk)} published file IDs.')
+            async with self._fetch('GET', self._WORKSHOP_API_DETAILS, params=params) as resp:
+                if resp.status == 200:
+                    j = await resp.json()
+                    for item in j['response'].get('publishedfiledetails', []):
+                        details[str(item['publishedfileid'])] = item
+                else:
+                    api_logger.error(f'GetDetails: API Status {resp.status}, Error: {await resp.text()}')
+        return details
+
+    @classmethod
+    async def prefetch(cls, rows: list, api_key: str = None, session: aiohttp.ClientSession = None,
+                       limits: RateLimits = None, cache: ResponseCache = None, bound=None) -> dict:
+        if not api_key or not rows:
+            return {}
+
+        bound = bound or cls._unbound
+        apicall = cls(session, limits=limits)
+        ids = list(dict.fromkeys(str(x['mods']) for x in rows))
+        details = {}
+        for start in range(0, len(ids), cls._WORKSHOP_BATCH_SIZE):
+            details.update(await bound(cls._API_HOST,
+                                       apicall.get_details(ids[start:start + cls._WORKSHOP_BATCH_SIZE], api_key)))
+        return {'details': details}
 
     async def get_update(self, app_id: str, published_file_id: str, mods_dir: str, version: str = None, api_key: str = None) -> int:
         if not api_key:
             api_logger.error(f'{app_id}-{published_file_id}: The steam_api_key is null or empty and cannot get an '
                              f'update for the mod. Please provide a valid api key.')
-        else:
-            request = self._WORKSHOP_API_LATEST_INFO.format(api_key, published_file_id, app_id)
-            api_logger.debug(f"Start API request: {request.replace(api_key, '<removed_key>')}")
-            async with aiohttp.request('GET', request) as resp:
-                if resp.status == 200:
-                    j = await resp.json()
+            return 1
 
-                    self.provider = 'workshop'
-                    self.app = app_id
-                    self.mods = published_file_id
-                    self.mods_dir = mods_dir
-                    self.version = j['response']['publishedfiledetails'][0]['time_updated']
-                    self.title = j['response']['publishedfiledetails'][0]['title']
-                    self.description = j['response']['publishedfiledetails'][0]['file_description']
-                    self.full_mods_name = app_id + '-' + published_file_id
-
-                    api_logger.debug(
-                        f'The request from the "Thunderstore" API was successfull for the APP ID {app_id} and the published file ID {published_file_id}.')
-                    return 0
-                else:
-                    api_logger.error(f'{app_id}-{published_file_id}: API Status {resp.status}, Error: {await resp.text()}')
-                    return 1
+        details = self.details
+        if details is None or str(published_file_id) not in details:
+            details = await self.get_details([published_file_id], api_key)
+
+        item = details.get(str(published_file_id))
+        if item is None:
+            api_logger.error(f'{app_id}-{published_file_id}: The published file ID was not returned by the API.')
+            return 1
+
+        if item.get('result') != 1:
+            api_logger.error(f"{app_id}-{published_file_id}: API result {item.get('result')} for the published file ID.")
+            return 1
+
+        if str(item.get('consumer_appid')) != str(app_id):
+            api_logger.warning(f"{app_id}-{published_file_id}: The published file ID belongs to the APP ID "
+                               f"{item.get('consumer_appid')}.")
+
+        self.provider = 'workshop'
+        self.app = app_id
+        self.mods = published_file_id
+        self.mods_dir = mods_dir
+        self.version = item['time_updated']
+        self.title = item['title']
+        self.description = item.get('file_description')
+        self.full_mods_name = f'{app_id}-{published_file_id}'
+        self.size = int(item['file_size']) if item.get('file_size') else None
+
+        api_logger.debug(
+            f'The request from the "Workshop" API was successfull for the APP ID {app_id} and the published file ID {published_file_id}.')
+        return 0
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import time
+from vapordmods.mods.modsmanager import ModsManager
+from vapordmods.mods.records import ModRecord, ModRecordStore
+
+logger = logging.getLogger(__name__)
+
+
+# Keeps a ModsManager, its session, caches and parsed configuration alive between checks. The configuration is only
+# read again when vapordmods.yml changes, and each provider is polled on its own interval.
+class ModsDaemon:
+    _DEFAULT_INTERVALS = {
+        'thunderstore': 300,
+        'github': 900,
+        'nexusmods': 3600,
+        'workshop': 900,
+    }
+
+    def __init__(self, manager: ModsManager, nmods_api_key: str = None, steam_api_key: str = None,
+                 intervals: dict = None, config_interval: float = 5):
+        self.manager = manager
+        self.nmods_api_key = nmods_api_key
+        self.steam_api_key = steam_api_key
+        self.intervals = dict(self._DEFAULT_INTERVALS, **(intervals or {}))
+        self.config_interval = config_interval
+        self.cfg_mods = {}
+        self.mods_status = {}
+        self.next_polls = {}
+        self._cfg_stat = None
+        self._next_config_check = 0
+        self._stop = None
+
+    @staticmethod
+    def make_key(row: dict):
+        return ModRecord.make_key(row['provider'], row['app'], row['mods'])
+
+    def get_mods_status(self):
+        return list(self.mods_status.values())
+
+    def __get_cfg_stat(self):
+        try:
+            stat = os.stat(self.manager.cfg_filename)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    async def check_config(self):
+        stat = self.__get_cfg_stat()
+        if stat is None or stat == self._cfg_stat:
+            return []
+
+        self._cfg_stat = stat
+        try:
+            valid = await self.manager.load_cfg_data()
+        except Exception as er:
+            logger.error(er)
+            valid = False
+        if not valid:
+            # The previous configuration is kept until the file is fixed.
+            logger.error(f'The configuration {self.manager.cfg_filename} is invalid and is ignored.')
+            return []
+
+        cfg_mods = {self.make_key(x): x for x in self.manager.get_cfg_mods()}
+        changed = [x for key, x in cfg_mods.items() if self.cfg_mods.get(key) != x]
+        for key in set(self.cfg_mods) - set(cfg_mods):
+            self.mods_status.pop(key, None)
+        self.cfg_mods = cfg_mods
+
+        logger.info(f'The configuration was loaded, {len(changed)} mods were added or changed.')
+        return changed
+
+    async def poll(self, rows: list):
+        if not rows:
+            return 0
+
+        if not self.manager.mods_info:
+            await self.manager.load_mods_info()
+
+        results = await self.manager.resolve_mods(rows, self.nmods_api_key, self.steam_api_key)
+        updates = ModRecordStore(ModRecord.from_dict(x) for x in results if x is not None)
+        status = updates.diff(ModRecordStore.from_dicts(self.manager.get_mods_info()))
+        for row in status:
+            self.mods_status[self.make_key(row)] = row
+
+        to_update = [x for x in status if x['need_update']]
+        if not to_update:
+            return 0
+
+        logger.info(f'{len(to_update)} mods have an update to install.')
+        self.manager.mods_status = to_update
+        await self.manager.update_mods()
+        await self.manager.load_mods_info()
+
+        installed = ModRecordStore.from_dicts(self.manager.get_mods_info())
+        for row in to_update:
+            record = installed.get(row['provider'], row['app'], row['mods'])
+            row['need_update'] = record is None or record.version != row['version']
+        return len(to_update)
+
+    async def check(self):
+        now = time.monotonic()
+        rows = {}
+        if now >= self._next_config_check:
+            self._next_config_check = now + self.config_interval
+            rows.update((self.make_key(x), x) for x in await self.check_config())
+
+        for provider, interval in self.intervals.items():
+            if now >= self.next_polls.get(provider, 0):
+                self.next_polls[provider] = now + interval
+                rows.update((key, x) for key, x in self.cfg_mods.items() if x['provider'] == provider)
+
+        return await self.poll(list(rows.values()))
+
+    def __get_timeout(self):
+        return max(min([self._next_config_check] + list(self.next_polls.values())) - time.monotonic(), 0)
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        while not self._stop.is_set():
+            try:
+                await self.check()
+            except Exception as er:
+                logger.error(f'Error during the check of the mods: {er}')
+
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.__get_timeout())
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
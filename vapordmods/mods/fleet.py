@@ -0,0 +1,156 @@
+import asyncio
+import aiohttp
+import os
+import logging
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.session import create_session
+from vapordmods.mods.modsmanager import ModsManager
+from vapordmods.mods.resolver import ModsResolver
+from vapordmods.tools.archive_cache import ArchiveCache
+from vapordmods.tools.executors import Executors
+from vapordmods.tools.metrics import Metrics
+from vapordmods.tools.scheduler import DownloadScheduler
+from vapordmods.tools.utils import get_user_app_data
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vapordmods.tools.steamcmd import SteamManager
+
+logger = logging.getLogger(__name__)
+
+
+# Every ModsManager of the fleet shares the session, the API cache, the archive cache and the executors, so a mod
+# used by several instances is resolved and downloaded once and then extracted into each mods_dir.
+class FleetManager:
+
+    def __init__(self, install_dirs: list, client: 'SteamManager' = None, max_concurrency: int = 16,
+                 max_per_host: int = 4, request_timeout: float = 30, session: aiohttp.ClientSession = None,
+                 progress_callback=None, user_app_data_dir: str = None, cache_ttl: float = 300,
+                 cache_max_size: int = 67108864, thunderstore_community: str = None,
+                 archive_cache_size: int = 2147483648, io_workers: int = None, extract_processes: int = 0,
+                 rate_limits: dict = None, metrics: Metrics = None, download_segments: int = 0,
+                 max_downloads: int = 16, max_downloads_per_host: int = 8, bandwidth: float = None):
+        self.metrics = metrics or Metrics()
+        self.resolver = ModsResolver(max_concurrency, max_per_host, request_timeout, rate_limits, self.metrics)
+        self.session = session
+        self._own_session = session is None
+        self.user_app_data_dir = user_app_data_dir or os.path.join(get_user_app_data(), '.vapordmods')
+        self.cache = None
+        if cache_ttl is not None:
+            self.cache = ResponseCache(os.path.join(self.user_app_data_dir, 'cache', 'api'), cache_ttl, cache_max_size)
+        self.executors = Executors(io_workers, extract_processes)
+        self.scheduler = DownloadScheduler(max_downloads, max_downloads_per_host, bandwidth, self.metrics)
+        self.archive_cache = None
+        if archive_cache_size is not None:
+            self.archive_cache = ArchiveCache(os.path.join(self.user_app_data_dir, 'cache', 'archives'),
+                                              archive_cache_size, executors=self.executors)
+        self.thunderstore_index = None
+        if thunderstore_community:
+            from vapordmods.api.thunderstore_index import ThunderstoreIndex
+
+            self.thunderstore_index = ThunderstoreIndex(os.path.join(self.user_app_data_dir, 'cache'),
+                                                        thunderstore_community)
+            self.resolver.provider_options[ModsManager._THUNDERSTORE_NAME] = {'index': self.thunderstore_index}
+
+        self.managers = []
+        for install_dir in install_dirs:
+            manager = ModsManager(install_dir, client, session=session, progress_callback=progress_callback,
+                                  user_app_data_dir=self.user_app_data_dir, cache_ttl=None,
+                                  archive_cache_size=None, metrics=self.metrics, download_segments=download_segments)
+            manager.use_resources(self.executors, self.archive_cache, self.scheduler)
+            # The download links of the members count against the same per-host budgets as the fleet resolution.
+            manager.resolver.rate_limits = self.resolver.rate_limits
+            self.managers.append(manager)
+
+    async def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = create_session(limit_per_host=max(self.resolver.max_per_host, 8))
+            self._own_session = True
+            for manager in self.managers:
+                manager.use_session(self.session)
+        return self.session
+
+    async def close(self):
+        for manager in self.managers:
+            await manager.close()
+
+        if self._own_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+        if self.archive_cache is not None:
+            self.archive_cache.close()
+
+        if self.thunderstore_index is not None:
+            self.thunderstore_index.close()
+
+        self.executors.shutdown(wait=False)
+        self.metrics.close()
+
+    async def __aenter__(self):
+        await self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def get_rate_limits(self):
+        return self.resolver.get_rate_limits()
+
+    def get_download_queue(self):
+        return self.scheduler.get_status()
+
+    @staticmethod
+    def make_key(row: dict):
+        # The mods_dir doesn't change the resolution, only where the mod is installed.
+        return str(row['provider']), str(row['app']), str(row['mods']), str(row['version']), str(row['filename'])
+
+    async def refresh_mods_info(self, nmods_api_key: str = None, steam_api_key: str = None):
+        try:
+            cfg_mods = {}
+            unique_mods = {}
+            for manager in self.managers:
+                manager.mods_status = {}
+                if not await manager.load_cfg_data():
+                    logger.error(f"The configuration of {manager.install_dir} is invalid, the instance is skipped.")
+                    continue
+
+                manager.mods_info = {}
+                await manager.load_mods_info()
+                cfg_mods[manager] = manager.get_cfg_mods()
+                for row in cfg_mods[manager]:
+                    unique_mods.setdefault(self.make_key(row), row)
+
+            session = await self.get_session()
+            if self.thunderstore_index is not None and \
+                    any(x[0] == ModsManager._THUNDERSTORE_NAME for x in unique_mods):
+                await self.thunderstore_index.refresh(session)
+
+            keys = list(unique_mods)
+            api_keys = ModsManager.get_api_keys(nmods_api_key, steam_api_key)
+            results = await self.resolver.resolve([unique_mods[x] for x in keys], api_keys, session, self.cache)
+            resolved = dict(zip(keys, results))
+            logger.debug(f'{len(keys)} unique mods resolved for {len(cfg_mods)} instances.')
+
+            for manager, rows in cfg_mods.items():
+                results = []
+                for row in rows:
+                    result = resolved[self.make_key(row)]
+                    results.append(dict(result, mods_dir=row['mods_dir']) if result is not None else None)
+                manager.api_keys = api_keys
+                manager.set_resolved_mods(results)
+            return 1
+        except Exception as er:
+            logger.error(f"Error during update for mods: {er}")
+            return 0
+
+    async def update_mods(self):
+        managers = [x for x in self.managers if len(x.get_mods_status())]
+        if not managers:
+            logger.error("No mods information. Please execute the method 'refresh_mods_info'.")
+            return 0
+
+        await self.get_session()
+        # The archive cache lock makes the managers wait for a download already started by another one.
+        results = await asyncio.gather(*[x.update_mods() for x in managers])
+        return int(all(results))
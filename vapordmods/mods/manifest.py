@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import sqlite3
+import yaml
+from vapordmods.mods.records import ModRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ManifestStore:
+    _MIGRATED_SUFFIX = '.migrated'
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS mods ('
+                            'provider TEXT, app TEXT, mods TEXT, data TEXT, '
+                            'PRIMARY KEY (provider, app, mods))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS files ('
+                            'provider TEXT, app TEXT, mods TEXT, mods_dir TEXT, path TEXT, size INTEGER, crc INTEGER, '
+                            'PRIMARY KEY (provider, app, mods, path))')
+            self.db.execute('CREATE INDEX IF NOT EXISTS files_path ON files (mods_dir, path)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def close(self):
+        self.db.close()
+
+    def migrate_yaml(self, yaml_filename: str):
+        if not os.path.exists(yaml_filename):
+            return 0
+
+        with open(yaml_filename, 'r') as file:
+            records = yaml.safe_load(file) or []
+
+        with self.db:
+            for record in records:
+                self._upsert(record)
+        os.replace(yaml_filename, yaml_filename + self._MIGRATED_SUFFIX)
+        logger.info(f'{len(records)} mods migrated from {yaml_filename} to {self.filename}.')
+        return len(records)
+
+    def _upsert(self, record: dict):
+        key = ModRecord.make_key(record['provider'], record['app'], record['mods'])
+        self.db.execute('INSERT OR REPLACE INTO mods (provider, app, mods, data) VALUES (?, ?, ?, ?)',
+                        (*key, json.dumps(record)))
+
+    def _set_files(self, record: dict, files: dict):
+        key = ModRecord.make_key(record['provider'], record['app'], record['mods'])
+        self.db.execute('DELETE FROM files WHERE provider = ? AND app = ? AND mods = ?', key)
+        self.db.executemany('INSERT INTO files (provider, app, mods, mods_dir, path, size, crc) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            [(*key, record['mods_dir'], path, x['size'], x['crc']) for path, x in files.items()])
+
+    def upsert(self, record: dict, files: dict = None):
+        with self.db:
+            self._upsert(record)
+            if files is not None:
+                self._set_files(record, files)
+
+    def get_files(self, provider, app, mods):
+        rows = self.db.execute('SELECT mods_dir, path, size, crc FROM files WHERE provider = ? AND app = ? AND mods = ?',
+                               ModRecord.make_key(provider, app, mods)).fetchall()
+        if not rows:
+            return None, {}
+        return rows[0][0], {x[1]: {'size': x[2], 'crc': x[3]} for x in rows}
+
+    def get_shared_files(self, provider, app, mods, mods_dir: str, paths: list):
+        shared = set()
+        for path in paths:
+            row = self.db.execute('SELECT 1 FROM files WHERE mods_dir = ? AND path = ? '
+                                  'AND NOT (provider = ? AND app = ? AND mods = ?)',
+                                  (mods_dir, path, *ModRecord.make_key(provider, app, mods))).fetchone()
+            if row is not None:
+                shared.add(path)
+        return shared
+
+    def upsert_many(self, records: list):
+        with self.db:
+            for record in records:
+                self._upsert(record)
+
+    def delete(self, provider, app, mods):
+        with self.db:
+            self.db.execute('DELETE FROM mods WHERE provider = ? AND app = ? AND mods = ?',
+                            ModRecord.make_key(provider, app, mods))
+            self.db.execute('DELETE FROM files WHERE provider = ? AND app = ? AND mods = ?',
+                            ModRecord.make_key(provider, app, mods))
+
+    def get(self, provider, app, mods):
+        row = self.db.execute('SELECT data FROM mods WHERE provider = ? AND app = ? AND mods = ?',
+                              ModRecord.make_key(provider, app, mods)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load(self):
+        return [json.loads(x[0]) for x in self.db.execute('SELECT data FROM mods ORDER BY rowid')]
+
+    def get_meta(self, key: str, default=None):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value):
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, json.dumps(value)))
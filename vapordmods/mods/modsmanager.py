@@ -1,23 +1,31 @@
-from steam.monkey import patch_minimal
-
-patch_minimal()
-
-import shutil
-import tempfile
 import asyncio
 import aiofiles
 import aiofiles.os
 import os
 import aiohttp
+import functools
 import yaml
 import logging
-import zipfile
-import pandas as pd
-from cerberus import Validator
-from pathlib import Path
-from vapordmods.api import worhshop, thunderstore, nexusmods, github
+import time
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.nexusmods import nexusmods
+from vapordmods.api.session import create_session
+from vapordmods.mods.manifest import ManifestStore
+from vapordmods.mods.records import ModRecord, ModRecordStore
+from vapordmods.mods.resolver import ModsResolver
 from vapordmods.mods.schema import schema
-from vapordmods.tools.steamcmd import SteamManager
+from vapordmods.tools.archive_cache import ArchiveCache
+from vapordmods.tools.download import download_file, download_file_segmented, get_content_length
+from vapordmods.tools.executors import Executors
+from vapordmods.tools.extract import extract_archive, remove_files
+from vapordmods.tools.metrics import Metrics
+from vapordmods.tools.scheduler import DownloadScheduler
+from vapordmods.tools.utils import get_user_app_data
+from typing import TYPE_CHECKING
+from yarl import URL
+
+if TYPE_CHECKING:
+    from vapordmods.tools.steamcmd import SteamManager
 
 logger = logging.getLogger(__name__)
 
@@ -25,20 +33,56 @@ logger = logging.getLogger(__name__)
 class ModsManager:
     _CFG_FILENAME = 'vapordmods.yml'
     _MANIFESTS_FILENAME = 'vapordmods.manifests'
+    _MANIFESTS_DB_FILENAME = 'vapordmods.manifests.db'
     _THUNDERSTORE_NAME = 'thunderstore'
     _NEXUSMODS_NAME = 'nexusmods'
     _WORKSHOP_NAME = 'workshop'
     _GITHUB_NAME = 'github'
-
-    def __init__(self, install_dir: str, client: SteamManager = None):
+    _NEXUSMODS_LAST_CHECKED = 'nexusmods_last_checked'
+    _STEAMPIPE_HOST = 'steampipe'
+
+    def __init__(self, install_dir: str, client: 'SteamManager' = None, max_concurrency: int = 16,
+                 max_per_host: int = 4, request_timeout: float = 30, session: aiohttp.ClientSession = None,
+                 progress_callback=None, user_app_data_dir: str = None, cache_ttl: float = 300,
+                 cache_max_size: int = 67108864, thunderstore_community: str = None,
+                 archive_cache_size: int = 2147483648, io_workers: int = None, extract_processes: int = 0,
+                 rate_limits: dict = None, metrics: Metrics = None, download_segments: int = 0,
+                 max_downloads: int = 16, max_downloads_per_host: int = 8, bandwidth: float = None):
         self.default_mods_dir = None
         self.install_dir = install_dir
         self.client = client
         self.manifests_filename = os.path.join(install_dir, self._MANIFESTS_FILENAME)
+        self.manifests_db_filename = os.path.join(install_dir, self._MANIFESTS_DB_FILENAME)
+        self.manifest = None
         self.cfg_filename = os.path.join(install_dir, self._CFG_FILENAME)
         self.cfg_data = {}
         self.mods_info = {}
         self.mods_status = {}
+        self.api_keys = {}
+        self.metrics = metrics or Metrics()
+        self.resolver = ModsResolver(max_concurrency, max_per_host, request_timeout, rate_limits, self.metrics)
+        self.session = session
+        self._own_session = session is None
+        self.progress_callback = progress_callback
+        self.download_segments = download_segments
+        self.scheduler = DownloadScheduler(max_downloads, max_downloads_per_host, bandwidth, self.metrics)
+        self.user_app_data_dir = user_app_data_dir or os.path.join(get_user_app_data(), '.vapordmods')
+        self.cache = None
+        if cache_ttl is not None:
+            self.cache = ResponseCache(os.path.join(self.user_app_data_dir, 'cache', 'api'), cache_ttl, cache_max_size)
+        self.executors = Executors(io_workers, extract_processes)
+        self._own_resources = True
+        self.archive_cache = None
+        if archive_cache_size is not None:
+            self.archive_cache = ArchiveCache(os.path.join(self.user_app_data_dir, 'cache', 'archives'),
+                                              archive_cache_size, executors=self.executors)
+        self.thunderstore_index = None
+        if thunderstore_community:
+            from vapordmods.api.thunderstore_index import ThunderstoreIndex
+
+            self.thunderstore_index = ThunderstoreIndex(os.path.join(self.user_app_data_dir, 'cache'),
+                                                        thunderstore_community)
+            self.resolver.provider_options[self._THUNDERSTORE_NAME] = {'index': self.thunderstore_index}
 
         try:
             loop = asyncio.get_running_loop()
@@ -60,6 +104,52 @@ class ModsManager:
         async with aiofiles.open(self.cfg_filename, 'wb') as cfg_file:
             await cfg_file.write(template)
 
+    async def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = create_session(limit_per_host=max(self.resolver.max_per_host, 8))
+            self._own_session = True
+        return self.session
+
+    def use_session(self, session: aiohttp.ClientSession):
+        self.session = session
+        self._own_session = False
+
+    def use_resources(self, executors: Executors, archive_cache: ArchiveCache, scheduler: DownloadScheduler):
+        # Shared with other managers, the owner closes them.
+        self.executors.shutdown(wait=False)
+        self.executors = executors
+        self.archive_cache = archive_cache
+        self.scheduler = scheduler
+        self._own_resources = False
+
+    async def close(self):
+        if self._own_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+
+        if not self._own_resources:
+            return
+
+        if self.archive_cache is not None:
+            self.archive_cache.close()
+
+        if self.thunderstore_index is not None:
+            self.thunderstore_index.close()
+
+        self.executors.shutdown(wait=False)
+        self.metrics.close()
+
+    async def __aenter__(self):
+        await self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
     @staticmethod
     async def __load_yaml(filename):
         if await aiofiles.os.path.exists(filename):
@@ -69,6 +159,8 @@ class ModsManager:
             raise FileExistsError(filename)
 
     async def load_cfg_data(self):
+        from cerberus import Validator
+
         cfg_data = await self.__load_yaml(self.cfg_filename)
         mods_validator = Validator(schema)
 
@@ -84,9 +176,20 @@ class ModsManager:
         self.default_mods_dir = cfg_data['config']['default_mods_dir'] or self.install_dir
         return True
 
+    def get_manifest(self):
+        if self.manifest is None:
+            self.manifest = ManifestStore(self.manifests_db_filename)
+            self.manifest.migrate_yaml(self.manifests_filename)
+        return self.manifest
+
+    def __commit_mod(self, row: dict, files: dict = None):
+        record = ModRecord.from_dict(row)
+        record.need_update = False
+        with self.metrics.phase('manifest', provider=row['provider'], app=row['app'], mods=row['mods']):
+            self.get_manifest().upsert(record.to_dict(), files)
+
     async def load_mods_info(self):
-        if os.path.exists(self.manifests_filename):
-            self.mods_info = await self.__load_yaml(self.manifests_filename)
+        self.mods_info = self.get_manifest().load()
 
     def get_mods_info(self):
         return self.mods_info
@@ -94,143 +197,284 @@ class ModsManager:
     def get_mods_status(self):
         return self.mods_status
 
-    async def refresh_mods_info(self, nmods_api_key: str = None, steam_api_key: str = None):
-        try:
-            suffixes = '_current'
-            await self.load_cfg_data()
-            self.mods_info = {}
-            await self.load_mods_info()
-
-            df_cfg = pd.DataFrame.from_dict(self.cfg_data['mods'])
-            for col in ['version', 'mods_dir']:
-                if col not in df_cfg.columns:
-                    df_cfg[col] = ''
-
-            df_cfg = df_cfg.fillna('')
-            df_cfg.loc[((df_cfg['mods_dir'] == '') | (df_cfg['mods_dir'] is None)), 'mods_dir'] = self.default_mods_dir
-
-            # Requests mods update
-            mods_update = []
-            apicall = None
-            list_api_key = {self._THUNDERSTORE_NAME: None, self._NEXUSMODS_NAME: nmods_api_key,
-                            self._WORKSHOP_NAME: steam_api_key, self._GITHUB_NAME: None}
-            for idx, row in df_cfg.iterrows():
-                apicall = getattr(globals()[row['provider']], row['provider'])()
-                if row['provider'] in (self._THUNDERSTORE_NAME, self._NEXUSMODS_NAME, self._WORKSHOP_NAME):
-                    params = {
-                        'namespace': row['app'],
-                        'name': row['mods'],
-                        'mods_dir': row['mods_dir'],
-                        'version': row['version'],
-                        'api_key': list_api_key[row['provider']]
-                    }
-                else:
-                    params = {
-                        'owner': row['app'],
-                        'repo': row['mods'],
-                        'mods_dir': row['mods_dir'],
-                        'version': row['version'],
-                        'filename': row['filename']
-                    }
-
-                if await apicall.get_update(**params) == 0:
-                    mods_update.append(apicall.return_data())
-
-            df_update = pd.DataFrame(mods_update)
-            df_update['need_update'] = False
-
-            if len(self.mods_info):
-                df_current = pd.DataFrame(self.mods_info)
-                df_status = df_update.merge(df_current, on=['provider', 'app', 'mods'], suffixes=(None, suffixes))
-                df_status['need_update'] = df_status['version'] != df_status[f'version{suffixes}']
-            else:
-                df_status = df_update
-                df_status['need_update'] = True
-
-            self.mods_status = df_status.to_dict('records')
-            return 1
-        except Exception as er:
-            logger.error(f"Error during update for mods: {er}")
-            return 0
+    def get_rate_limits(self):
+        return self.resolver.get_rate_limits()
+
+    def get_download_queue(self):
+        return self.scheduler.get_status()
+
+    def get_cfg_mods(self):
+        cfg_mods = []
+        for mod in self.cfg_data['mods']:
+            row = {k: '' if v is None else v for k, v in mod.items()}
+            for col in ['version', 'mods_dir', 'filename']:
+                row.setdefault(col, '')
+            row['mods_dir'] = row['mods_dir'] or self.default_mods_dir
+            cfg_mods.append(row)
+        return cfg_mods
+
+    @classmethod
+    def get_api_keys(cls, nmods_api_key: str = None, steam_api_key: str = None):
+        return {cls._THUNDERSTORE_NAME: None, cls._NEXUSMODS_NAME: nmods_api_key,
+                cls._WORKSHOP_NAME: steam_api_key, cls._GITHUB_NAME: None}
+
+    def set_resolved_mods(self, results: list):
+        mods_update = ModRecordStore(ModRecord.from_dict(x) for x in results if x is not None)
+        mods_current = ModRecordStore.from_dicts(self.mods_info)
+        self.mods_status = mods_update.diff(mods_current)
+
+    def _emit_cache_stats(self, previous: dict):
+        for status, value in self.cache.stats.items():
+            if value - previous[status]:
+                self.metrics.count('api_cache', value - previous[status], status=status)
+
+    def __is_unchanged(self, row: dict, installed: dict):
+        return installed is not None and installed['mods_dir'] == row['mods_dir'] and \
+            (not row['version'] or str(row['version']) == str(installed['version']))
+
+    async def __prefilter_nexusmods(self, session, cfg_mods: list, api_key: str):
+        # Installed mods missing from the updated mods feed of their game since the last check keep their version.
+        last_checked = self.get_manifest().get_meta(self._NEXUSMODS_LAST_CHECKED, {})
+        games = {str(x['app']) for x in cfg_mods if x['provider'] == self._NEXUSMODS_NAME}
+        games = [x for x in games if x in last_checked]
+        if not api_key or not games:
+            return {}
+
+        apicall = nexusmods(session, self.cache, self.resolver.rate_limits)
+        feeds = await asyncio.gather(*[apicall.get_updated_mods(x, last_checked[x], api_key) for x in games])
+        updated = {game: feed for game, feed in zip(games, feeds) if feed is not None}
+
+        unchanged = {}
+        for row in cfg_mods:
+            if row['provider'] != self._NEXUSMODS_NAME or str(row['app']) not in updated or \
+                    str(row['mods']) in updated[str(row['app'])]:
+                continue
+            installed = self.get_manifest().get(row['provider'], row['app'], row['mods'])
+            if self.__is_unchanged(row, installed):
+                unchanged[ModRecord.make_key(row['provider'], row['app'], row['mods'])] = installed
+        logger.debug(f'{len(unchanged)} Nexus Mods mods were not updated since the last check.')
+        return unchanged
+
+    def __set_nexusmods_last_checked(self, cfg_mods: list, results: list, checked_at: float):
+        # A game is only marked as checked once all its mods are installed at their resolved version, so the next
+        # feeds still cover an update that failed to install.
+        games = {}
+        checked_mods = {}
+        for row, result in zip(cfg_mods, results):
+            if row['provider'] == self._NEXUSMODS_NAME:
+                installed = self.get_manifest().get(row['provider'], row['app'], row['mods'])
+                games[str(row['app'])] = games.get(str(row['app']), True) and result is not None and \
+                    installed is not None and str(result['version']) == str(installed['version'])
+                checked_mods.setdefault(str(row['app']), set()).add(str(row['mods']))
+
+        # The daemon only resolves the changed rows, the other mods of the game were not looked up.
+        for row in self.get_cfg_mods():
+            game = str(row['app'])
+            if row['provider'] == self._NEXUSMODS_NAME and str(row['mods']) not in checked_mods.get(game, ()):
+                games[game] = False
+
+        if games:
+            last_checked = self.get_manifest().get_meta(self._NEXUSMODS_LAST_CHECKED, {})
+            last_checked.update((game, checked_at) for game, checked in games.items() if checked)
+            self.get_manifest().set_meta(self._NEXUSMODS_LAST_CHECKED, last_checked)
+
+    async def resolve_mods(self, cfg_mods: list, nmods_api_key: str = None, steam_api_key: str = None):
+        self.api_keys = self.get_api_keys(nmods_api_key, steam_api_key)
+        session = await self.get_session()
+        if self.thunderstore_index is not None and any(x['provider'] == self._THUNDERSTORE_NAME for x in cfg_mods):
+            await self.thunderstore_index.refresh(session)
+
+        checked_at = time.time()
+        unchanged = await self.__prefilter_nexusmods(session, cfg_mods, nmods_api_key)
+        to_resolve = [x for x in cfg_mods if ModRecord.make_key(x['provider'], x['app'], x['mods']) not in unchanged]
+
+        cache_stats = dict(self.cache.stats) if self.cache is not None else None
+        resolved = iter(await self.resolver.resolve(to_resolve, self.api_keys, session, self.cache))
+        if cache_stats is not None:
+            self._emit_cache_stats(cache_stats)
+
+        results = [unchanged.get(ModRecord.make_key(x['provider'], x['app'], x['mods'])) or next(resolved)
+                   for x in cfg_mods]
+        self.__set_nexusmods_last_checked(cfg_mods, results, checked_at)
+        return results
 
-    @staticmethod
-    async def __extract_mods(filename, destination, row):
-        with zipfile.ZipFile(filename, 'r') as file:
-            temp_dir = os.path.join(tempfile.gettempdir(), 'vapord_temp')
+    async def refresh_mods_info(self, nmods_api_key: str = None, steam_api_key: str = None):
+        with self.metrics.phase('refresh') as event:
             try:
-                if row['provider'].lower() == 'thunderstore' and 'bepinexpack' in row['full_mods_name'].lower():
-                    benpinex = 'BepInEx'
-                    file_list = [x for x in file.namelist() if benpinex in x]
-                    benpinex_dir = file_list[0][0:file_list[0].index(os.sep)]
-                    temp_dir_bepinex = os.path.join(temp_dir, benpinex_dir)
-                    file.extractall(temp_dir, file_list)
-                    cp_dir = temp_dir_bepinex
-                else:
-                    file.extractall(temp_dir)
-                    cp_dir = temp_dir
-
-                shutil.copytree(cp_dir, row['mods_dir'], dirs_exist_ok=True)
+                await self.load_cfg_data()
+                self.mods_info = {}
+                await self.load_mods_info()
 
+                # Requests mods update
+                results = await self.resolve_mods(self.get_cfg_mods(), nmods_api_key, steam_api_key)
+                self.set_resolved_mods(results)
                 return 1
             except Exception as er:
-                logger.error(er)
+                event['status'] = 'error'
+                logger.error(f"Error during update for mods: {er}")
                 return 0
-            finally:
-                if await aiofiles.os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
 
-    async def __make_request(self, session, row):
+    async def __extract_mods(self, filename, row):
+        sub_root = None
+        if row['provider'].lower() == 'thunderstore' and 'bepinexpack' in row['full_mods_name'].lower():
+            sub_root = 'BepInEx'
+
         try:
-            resp = await session.request(method="GET", url=row['download_url'])
+            with self.metrics.phase('extract', provider=row['provider'], app=row['app'], mods=row['mods']) as event:
+                manifest = self.get_manifest()
+                previous_dir, previous_files = manifest.get_files(row['provider'], row['app'], row['mods'])
+                if previous_dir != row['mods_dir']:
+                    previous_files = {}
+
+                files = await self.executors.run_cpu(extract_archive, filename, row['mods_dir'], sub_root,
+                                                     previous_files)
+
+                removed = set(previous_files) - set(files)
+                if removed:
+                    removed -= manifest.get_shared_files(row['provider'], row['app'], row['mods'], row['mods_dir'],
+                                                         list(removed))
+                    await self.executors.run_io(remove_files, row['mods_dir'], list(removed))
+
+                event['bytes'] = sum(x['size'] for x in files.values())
+                event['files'] = len(files)
+                event['removed'] = len(removed)
+            return files
+        except Exception as er:
+            logger.error(er)
+            return None
+
+    async def __get_download_url(self, session, row):
+        if row['provider'] == self._NEXUSMODS_NAME:
+            # The resolved Nexus Mods url is the download link request, the link itself expires.
+            apicall = nexusmods(session, limits=self.resolver.rate_limits)
+            return await apicall.get_download_link(row['download_url'], self.api_keys.get(self._NEXUSMODS_NAME))
+        return row['download_url']
+
+    async def __download_file(self, session, row, url, filename):
+        progress = functools.partial(self.progress_callback, row) if self.progress_callback else None
+        size = row.get('size')
+        if size is None and self.scheduler.is_full():
+            # The size is only needed to order the downloads waiting for a slot.
+            size = await get_content_length(session, url)
+
+        async with self.scheduler.slot(URL(url).host, size) as bandwidth:
+            throttle = bandwidth.throttle if bandwidth is not None else None
+            with self.metrics.phase('download', provider=row['provider'], app=row['app'], mods=row['mods']) as event:
+                stats = {}
+                if self.download_segments > 1:
+                    filename = await download_file_segmented(session, url, filename, progress,
+                                                             self.download_segments, stats=stats, throttle=throttle)
+                else:
+                    filename = await download_file(session, url, filename, progress, stats=stats, throttle=throttle)
+                event.update(stats)
+                if filename is None:
+                    event['status'] = 'error'
+        return filename
+
+    async def __download_archive(self, session, row):
+        if self.archive_cache is None:
+            url = await self.__get_download_url(session, row)
+            if url is None:
+                return None
+            key = ArchiveCache.make_key(row['provider'], row['app'], row['mods'], row['version'])
+            archive_name = ArchiveCache.make_download_name(key, URL(url).name or row['full_mods_name'] + '.zip')
+            await aiofiles.os.makedirs(row['mods_dir'], exist_ok=True)
+            return await self.__download_file(session, row, url, os.path.join(row['mods_dir'], archive_name))
+
+        key = self.archive_cache.make_key(row['provider'], row['app'], row['mods'], row['version'])
+        async with self.archive_cache.lock(key):
+            archive = await self.archive_cache.get(key)
+            self.metrics.count('archive_cache', status='hit' if archive is not None else 'miss',
+                               provider=row['provider'])
+            if archive is None:
+                url = await self.__get_download_url(session, row)
+                if url is None:
+                    return None
+                archive_name = URL(url).name or row['full_mods_name'] + '.zip'
+                download_filename = self.archive_cache.new_download_filename(key, archive_name)
+                try:
+                    filename = await self.__download_file(session, row, url, download_filename)
+                    if filename is not None:
+                        with self.metrics.phase('copy', provider=row['provider'], app=row['app'], mods=row['mods']):
+                            archive = await self.archive_cache.put(key, filename, archive_name)
+                finally:
+                    # Leftovers of a failed download, the file itself was moved to the cache by put.
+                    self.archive_cache.remove_download(download_filename)
+            return archive
 
-            if resp.status == 200:
-                await aiofiles.os.makedirs(row['mods_dir'], exist_ok=True)
+    async def __make_request(self, session, row):
+        try:
+            await aiofiles.os.makedirs(row['mods_dir'], exist_ok=True)
 
-                filename = os.path.join(row['mods_dir'], resp.url.name)
-                destination = os.path.join(row['mods_dir'], row['full_mods_name'])
-                async with aiofiles.open(filename, 'wb') as f:
-                    await f.write(await resp.read())
+            filename = await self.__download_archive(session, row)
+            if filename is None:
+                return 0
 
-                if await self.__extract_mods(filename, destination, row):
+            files = await self.__extract_mods(filename, row)
+            if files is not None:
+                if self.archive_cache is None:
                     await aiofiles.os.remove(filename)
-            else:
-                logger.error(f"Error with the request: {resp.status} {resp.text()}")
+                self.__commit_mod(row, files)
+                return 1
+
+            if self.archive_cache is not None:
+                # A cached archive that cannot be extracted would be served again on every run.
+                logger.warning(f"The cached archive of {row['full_mods_name']} {row['version']} is discarded.")
+                self.archive_cache.discard(
+                    self.archive_cache.make_key(row['provider'], row['app'], row['mods'], row['version']))
 
         except Exception as er:
             logger.error(er)
+        return 0
 
-    async def update_mods(self):
-        if not len(self.mods_status):
-            logger.error(f"No mods information. Please execute the method 'refresh_mods_info'.")
+    async def __update_workshop_mod(self, row, pubfile):
+        if pubfile is None:
+            logger.error(f"No manifest found for the APP_ID {row['app']} and published_file_id {row['mods']}.")
             return 0
 
+        host = URL(pubfile['file_url']).host if pubfile.get('file_url') else self._STEAMPIPE_HOST
+        size = int(pubfile['file_size']) if pubfile.get('file_size') else row.get('size')
         try:
-            list_to_update = [x for x in self.mods_status if x['need_update'] and x['provider'] in
-                              [self._THUNDERSTORE_NAME, self._NEXUSMODS_NAME, self._GITHUB_NAME]]
-
-            if len(list_to_update):
-                async with aiohttp.ClientSession() as session:
-                    tasks = [self.__make_request(session, i) for i in list_to_update]
-
-                    await asyncio.gather(*tasks)
-
-            list_to_update_workshop = [x for x in self.mods_status if
-                                       x['need_update'] == 'True' and x['provider'] == self._WORKSHOP_NAME]
-            if len(list_to_update_workshop):
-                for i in list_to_update_workshop:
-                    result = await self.client.update_worksop_mod(i['app'], i['mods'])
-                    if result == 1 and result(1):
-                        Path(result(1)).symlink_to(os.path.join(i['mods_dir'], i['title']))
-                    elif result == 1:
-                        logger.error(
-                            f"The symlink for the APP_ID {i['app']} and published_file_id {i['mods']} was note created.")
-                    else:
-                        logger.error(result(1))
-
-            with open(self.manifests_filename, 'w') as manifest:
-                yaml.safe_dump(self.mods_status, manifest)
+            async with self.scheduler.slot(host, size) as bandwidth:
+                result = await self.client.update_worksop_mod(row['mods_dir'], row['mods'], pubfile, bandwidth)
+            if result != 0:
+                logger.error(f"The update of the APP_ID {row['app']} and published_file_id {row['mods']} failed.")
+                return 0
 
+            self.__commit_mod(row)
             return 1
         except Exception as er:
             logger.error(er)
+        return 0
+
+    async def __update_workshop_mods(self, rows: list):
+        if not rows:
+            return 0
+
+        pubfiles = await self.client.search_workshop_items_manifest([x['mods'] for x in rows])
+        return sum(await asyncio.gather(*[self.__update_workshop_mod(x, pubfiles.get(str(x['mods']))) for x in rows]))
+
+    async def update_mods(self):
+        if not len(self.mods_status):
+            logger.error(f"No mods information. Please execute the method 'refresh_mods_info'.")
             return 0
+
+        with self.metrics.phase('update') as event:
+            try:
+                list_to_update = [x for x in self.mods_status if x['need_update'] and x['provider'] in
+                                  [self._THUNDERSTORE_NAME, self._NEXUSMODS_NAME, self._GITHUB_NAME]]
+                list_to_update_workshop = [x for x in self.mods_status if
+                                           x['need_update'] and x['provider'] == self._WORKSHOP_NAME]
+
+                # The HTTP and the workshop downloads share the slots and the bandwidth of the scheduler.
+                tasks = [self.__update_workshop_mods(list_to_update_workshop)]
+                if len(list_to_update):
+                    session = await self.get_session()
+                    tasks += [self.__make_request(session, i) for i in list_to_update]
+
+                event['installed'] = sum(await asyncio.gather(*tasks))
+                return 1
+            except Exception as er:
+                event['status'] = 'error'
+                logger.error(er)
+                return 0
@@ -0,0 +1,75 @@
+class ModRecord:
+    __slots__ = ('provider', 'app', 'mods', 'mods_dir', 'version', 'full_mods_name', 'title', 'description',
+                 'download_url', 'size', 'need_update')
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**{x: data[x] for x in cls.__slots__ if x in data})
+
+    @staticmethod
+    def make_key(provider, app, mods):
+        return str(provider), str(app), str(mods)
+
+    @property
+    def key(self):
+        return self.make_key(self.provider, self.app, self.mods)
+
+    def to_dict(self):
+        return {x: getattr(self, x) for x in self.__slots__}
+
+
+class ModRecordStore:
+    _KEY_FIELDS = ('provider', 'app', 'mods')
+    _SUFFIX = '_current'
+
+    def __init__(self, records=None):
+        self._records = []
+        self._index = {}
+        for record in records or []:
+            self.add(record)
+
+    @classmethod
+    def from_dicts(cls, data: list):
+        return cls(ModRecord.from_dict(x) for x in data or [])
+
+    def add(self, record: ModRecord):
+        key = record.key
+        if key in self._index:
+            self._records[self._index[key]] = record
+        else:
+            self._index[key] = len(self._records)
+            self._records.append(record)
+
+    def get(self, provider, app, mods):
+        idx = self._index.get(ModRecord.make_key(provider, app, mods))
+        return self._records[idx] if idx is not None else None
+
+    def __contains__(self, key):
+        return ModRecord.make_key(*key) in self._index
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def diff(self, current: 'ModRecordStore'):
+        current_fields = [x for x in ModRecord.__slots__ if x not in self._KEY_FIELDS]
+        status = []
+        for record in self._records:
+            data = record.to_dict()
+            if not len(current):
+                data['need_update'] = True
+                status.append(data)
+                continue
+
+            installed = current.get(record.provider, record.app, record.mods)
+            for field in current_fields:
+                data[field + self._SUFFIX] = getattr(installed, field) if installed is not None else None
+            data['need_update'] = installed is None or record.version != installed.version
+            status.append(data)
+        return status
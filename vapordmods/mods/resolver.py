@@ -0,0 +1,121 @@
+import asyncio
+import aiohttp
+import logging
+from vapordmods.api import worhshop, thunderstore, nexusmods, github
+from vapordmods.api.cache import ResponseCache
+from vapordmods.api.ratelimit import RateLimits
+from vapordmods.tools.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ModsResolver:
+    _PROVIDERS = {
+        'thunderstore': thunderstore.thunderstore,
+        'nexusmods': nexusmods.nexusmods,
+        'workshop': worhshop.workshop,
+        'github': github.github,
+    }
+
+    def __init__(self, max_concurrency: int = 16, max_per_host: int = 4, timeout: float = 30,
+                 rate_limits: dict = None, metrics: Metrics = None):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.rate_limits = RateLimits(rate_limits)
+        self.metrics = metrics or Metrics()
+        self.provider_options = {}
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    @staticmethod
+    def build_params(row: dict, api_key: str = None):
+        provider = row['provider']
+        if provider == 'github':
+            return {
+                'owner': row['app'],
+                'repo': row['mods'],
+                'mods_dir': row['mods_dir'],
+                'version': row['version'],
+                'filename': row['filename']
+            }
+
+        if provider == 'thunderstore':
+            keys = ('namespace', 'name')
+        elif provider == 'nexusmods':
+            keys = ('game_domain_name', 'mod_id')
+        else:
+            keys = ('app_id', 'published_file_id')
+
+        return {
+            keys[0]: row['app'],
+            keys[1]: row['mods'],
+            'mods_dir': row['mods_dir'],
+            'version': row['version'],
+            'api_key': api_key
+        }
+
+    def _get_host_semaphore(self, host: str):
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_semaphores[host]
+
+    async def _bound(self, host: str, coro):
+        # The host slot is taken first, so the requests waiting for a busy host don't hold the global slots.
+        async with self._get_host_semaphore(host), self._semaphore:
+            return await asyncio.wait_for(coro, self.timeout)
+
+    async def resolve_one(self, row: dict, api_keys: dict, session: aiohttp.ClientSession = None,
+                          cache: ResponseCache = None, prefetched: dict = None):
+        name = f"{row['provider']}:{row['app']}-{row['mods']}"
+        with self.metrics.phase('resolve', provider=row['provider'], app=row['app'], mods=row['mods']) as event:
+            event['status'] = 'error'
+            try:
+                options = dict(self.provider_options.get(row['provider'], {}))
+                options.update((prefetched or {}).get(row['provider'], {}))
+                apicall = self._PROVIDERS[row['provider']](session, cache, self.rate_limits, **options)
+                params = self.build_params(row, api_keys.get(row['provider']))
+
+                result = await self._bound(apicall._API_HOST, apicall.get_update(**params))
+
+                if result == 0:
+                    event['status'] = 'ok'
+                    return apicall.return_data()
+            except asyncio.TimeoutError:
+                event['status'] = 'timeout'
+                logger.error(f"{name}: The request timed out after {self.timeout} seconds.")
+            except Exception as er:
+                logger.error(f"{name}: Error during the resolution of the mod: {er}")
+        return None
+
+    async def resolve(self, rows: list, api_keys: dict, session: aiohttp.ClientSession = None,
+                      cache: ResponseCache = None):
+        # The semaphores are bound to the running loop, so they are created per batch.
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._host_semaphores = {}
+        prefetched = await self.prefetch(rows, api_keys, session, cache)
+        results = await asyncio.gather(*[self.resolve_one(row, api_keys, session, cache, prefetched) for row in rows])
+
+        for host, status in self.get_rate_limits().items():
+            if status['remaining'] is not None:
+                self.metrics.gauge('rate_limit_remaining', status['remaining'], host=host)
+            self.metrics.gauge('rate_limit_retries', status['retried'], host=host)
+        return results
+
+    async def prefetch(self, rows: list, api_keys: dict, session: aiohttp.ClientSession = None,
+                       cache: ResponseCache = None):
+        providers = list(self._PROVIDERS)
+        tasks = [self._PROVIDERS[x].prefetch([row for row in rows if row['provider'] == x], api_keys.get(x), session,
+                                             self.rate_limits, cache, self._bound) for x in providers]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        prefetched = {}
+        for provider, result in zip(providers, results):
+            if isinstance(result, Exception):
+                logger.error(f"{provider}: Error during the batch resolution of the mods: {result}")
+            else:
+                prefetched[provider] = result
+        return prefetched
+
+    def get_rate_limits(self):
+        return self.rate_limits.get_status()
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import TYPE_CHECKING
+from vapordmods.tools.download import PART_SUFFIX, VALIDATOR_SUFFIX
+
+if TYPE_CHECKING:
+    from vapordmods.tools.executors import Executors
+
+logger = logging.getLogger(__name__)
+
+HASH_BUFFER_SIZE = 1048576
+
+
+def file_sha256(filename: str):
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_BUFFER_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ArchiveCache:
+
+    def __init__(self, cache_dir: str, max_size: int = 2147483648, verify: bool = True,
+                 executors: 'Executors' = None):
+        self.cache_dir = cache_dir
+        self.executors = executors
+        self.blobs_dir = os.path.join(cache_dir, 'blobs')
+        self.download_dir = os.path.join(cache_dir, 'downloads')
+        self.max_size = max_size
+        self.verify = verify
+        self._locks = {}
+        self._db = None
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.download_dir, exist_ok=True)
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite'), check_same_thread=False,
+                                       timeout=30)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            with self._db:
+                self._db.execute('CREATE TABLE IF NOT EXISTS archives ('
+                                 'key TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, filename TEXT, last_used REAL)')
+        return self._db
+
+    @staticmethod
+    def make_key(provider, app, mods, version):
+        return '/'.join(str(x) for x in (provider, app, mods, version))
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def lock(self, key: str):
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    async def _run(self, func, *args):
+        if self.executors is not None:
+            return await self.executors.run_io(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _blob_path(self, sha256: str):
+        return os.path.join(self.blobs_dir, sha256[:2], sha256)
+
+    def _forget(self, key: str):
+        with self.db:
+            self.db.execute('DELETE FROM archives WHERE key = ?', (key,))
+
+    async def get(self, key: str):
+        row = self.db.execute('SELECT sha256, filename FROM archives WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        sha256, filename = row
+        blob = self._blob_path(sha256)
+        if not os.path.exists(blob):
+            self._forget(key)
+            return None
+
+        if self.verify:
+            if await self._run(file_sha256, blob) != sha256:
+                logger.warning(f'The cached archive {filename} for {key} is corrupted and is discarded.')
+                self._forget(key)
+                os.remove(blob)
+                return None
+
+        with self.db:
+            self.db.execute('UPDATE archives SET last_used = ? WHERE key = ?', (time.time(), key))
+        logger.debug(f'The archive {filename} for {key} was found in the cache.')
+        return blob
+
+    @staticmethod
+    def make_download_name(key: str, archive_name: str):
+        # Release assets often share a name (mod.zip), the key keeps concurrent downloads of different mods apart.
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '-' + archive_name
+
+    def discard(self, key: str):
+        row = self.db.execute('SELECT sha256 FROM archives WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return
+        self._forget(key)
+        # The blob is kept while another key still uses it.
+        if self.db.execute('SELECT 1 FROM archives WHERE sha256 = ?', (row[0],)).fetchone() is None:
+            try:
+                os.remove(self._blob_path(row[0]))
+            except OSError:
+                pass
+
+    def new_download_filename(self, key: str, archive_name: str):
+        # The cache can be shared by several processes, each download gets its own file so they never write or
+        # resume the same partial file.
+        fd, filename = tempfile.mkstemp(prefix=self.make_download_name(key, ''), suffix='-' + archive_name,
+                                        dir=self.download_dir)
+        os.close(fd)
+        return filename
+
+    @staticmethod
+    def remove_download(filename: str):
+        for x in (filename, filename + PART_SUFFIX, filename + PART_SUFFIX + VALIDATOR_SUFFIX):
+            try:
+                os.remove(x)
+            except FileNotFoundError:
+                pass
+
+    async def put(self, key: str, filename: str, name: str = None):
+        sha256 = await self._run(file_sha256, filename)
+        size = os.path.getsize(filename)
+        blob = self._blob_path(sha256)
+
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if os.path.exists(blob):
+            os.remove(filename)
+        else:
+            try:
+                os.replace(filename, blob)
+            except OSError:
+                await self._run(shutil.move, filename, blob)
+
+        name = name or os.path.basename(filename)
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO archives (key, sha256, size, filename, last_used) '
+                            'VALUES (?, ?, ?, ?, ?)', (key, sha256, size, name, time.time()))
+        self.evict(keep=sha256)
+        return blob
+
+    def evict(self, keep: str = None):
+        # Blobs are shared between keys, so the size is counted once per blob.
+        blobs = self.db.execute('SELECT sha256, MAX(size), MAX(last_used) FROM archives '
+                                'GROUP BY sha256 ORDER BY MAX(last_used)').fetchall()
+        total = sum(x[1] for x in blobs)
+        for sha256, size, last_used in blobs:
+            if total <= self.max_size:
+                break
+            if sha256 == keep:
+                continue
+
+            with self.db:
+                self.db.execute('DELETE FROM archives WHERE sha256 = ?', (sha256,))
+            try:
+                os.remove(self._blob_path(sha256))
+            except OSError:
+                pass
+            total -= size
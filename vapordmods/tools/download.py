@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import aiofiles
+import aiofiles.os
+import aiohttp
+from vapordmods.api.session import API_TIMEOUT, DOWNLOAD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1048576
+PART_SUFFIX = '.part'
+VALIDATOR_SUFFIX = '.validator'
+SEGMENT_MIN_SIZE = 8388608
+_CONTENT_RANGE_PATTERN = re.compile(r'bytes 0-0/(\d+)$')
+_CONTENT_RANGE_START_PATTERN = re.compile(r'bytes (\d+)-')
+
+
+def _get_validator(headers):
+    # If-Range only accepts a strong ETag or a Last-Modified date.
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+async def _read_validator(filename: str):
+    try:
+        async with aiofiles.open(filename, 'r') as f:
+            return (await f.read()).strip() or None
+    except FileNotFoundError:
+        return None
+
+
+async def _write_validator(filename: str, validator: str = None):
+    if validator is None:
+        await _remove(filename)
+        return
+    async with aiofiles.open(filename, 'w') as f:
+        await f.write(validator)
+
+
+async def _remove(filename: str):
+    try:
+        await aiofiles.os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+async def download_file(session: aiohttp.ClientSession,
+                        url: str,
+                        filename: str,
+                        progress=None,
+                        retries: int = 3,
+                        chunk_size: int = CHUNK_SIZE,
+                        stats: dict = None,
+                        throttle=None):
+    part_filename = filename + PART_SUFFIX
+    validator_filename = part_filename + VALIDATOR_SUFFIX
+    downloaded = 0
+    validator = None
+    if await aiofiles.os.path.exists(part_filename):
+        # A partial file is only resumed with the validator of the response it comes from, the server then sends
+        # the whole file again if it changed.
+        validator = await _read_validator(validator_filename)
+        if validator is not None:
+            downloaded = os.path.getsize(part_filename)
+        else:
+            await _remove(part_filename)
+
+    # Filled for the caller with the bytes received and the number of retries.
+    stats = stats if stats is not None else {}
+    stats.update(bytes=0, retries=0)
+
+    for attempt in range(retries + 1):
+        headers = {'Range': f'bytes={downloaded}-', 'If-Range': validator} if downloaded and validator else {}
+        try:
+            async with session.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT) as resp:
+                # A range of another offset or of another version of the file cannot be appended.
+                start = _CONTENT_RANGE_START_PATTERN.match(resp.headers.get('Content-Range', ''))
+                current = _get_validator(resp.headers)
+                if resp.status == 416 or (resp.status == 206 and (
+                        start is None or int(start.group(1)) != downloaded or current not in (None, validator))):
+                    logger.warning(f'{filename}: The partial file cannot be resumed, restarting the download.')
+                    downloaded = 0
+                    validator = None
+                    await _remove(part_filename)
+                    await _remove(validator_filename)
+                    continue
+
+                if resp.status == 206 and downloaded:
+                    mode = 'ab'
+                elif resp.status == 200:
+                    mode = 'wb'
+                    downloaded = 0
+                    validator = _get_validator(resp.headers)
+                    await _write_validator(validator_filename, validator)
+                else:
+                    logger.error(f'Error with the request: {resp.status} {await resp.text()}')
+                    return None
+
+                total = downloaded + resp.content_length if resp.content_length is not None else None
+                async with aiofiles.open(part_filename, mode) as f:
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        await f.write(chunk)
+                        downloaded += len(chunk)
+                        stats['bytes'] += len(chunk)
+                        if progress is not None:
+                            progress(downloaded, total)
+                        if throttle is not None:
+                            await throttle(len(chunk))
+
+            if total is not None and downloaded != total:
+                raise aiohttp.ClientPayloadError(f'Incomplete download: {downloaded} of {total} bytes.')
+
+            os.replace(part_filename, filename)
+            await _remove(validator_filename)
+            return filename
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as er:
+            if attempt == retries:
+                logger.error(f'{filename}: Download failed after {retries + 1} attempts: {er}')
+                return None
+            if downloaded and validator is None:
+                # Without a validator the server cannot tell if the partial file is still the same version.
+                logger.warning(f'{filename}: Download interrupted at {downloaded} bytes ({er}), restarting.')
+                downloaded = 0
+                await _remove(part_filename)
+            else:
+                logger.warning(f'{filename}: Download interrupted at {downloaded} bytes ({er}), resuming.')
+            stats['retries'] += 1
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+    return None
+
+
+def _get_sha256(filename: str, chunk_size: int = CHUNK_SIZE):
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+async def get_content_length(session: aiohttp.ClientSession, url: str):
+    try:
+        async with session.head(url, allow_redirects=True, timeout=API_TIMEOUT) as resp:
+            if resp.status == 200:
+                return resp.content_length
+    except (aiohttp.ClientError, asyncio.TimeoutError) as er:
+        logger.debug(f'{url}: The HEAD request failed: {er}')
+    return None
+
+
+async def _probe_ranges(session: aiohttp.ClientSession, url: str):
+    # A one byte range request gives the size, the validator and the url after the redirects, or a 200 when the
+    # server ignores the ranges.
+    async with session.get(url, headers={'Range': 'bytes=0-0'}, timeout=API_TIMEOUT) as resp:
+        match = _CONTENT_RANGE_PATTERN.match(resp.headers.get('Content-Range', ''))
+        if resp.status != 206 or match is None:
+            return None
+        await resp.read()
+        return str(resp.url), int(match.group(1)), _get_validator(resp.headers)
+
+
+async def _download_segment(session: aiohttp.ClientSession, url: str, part_filename: str, start: int, end: int,
+                            validator: str, state: dict, progress, retries: int, chunk_size: int, throttle):
+    position = start
+    for attempt in range(retries + 1):
+        headers = {'Range': f'bytes={position}-{end}'}
+        if validator:
+            headers['If-Range'] = validator
+        try:
+            async with session.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT) as resp:
+                if resp.status != 206:
+                    # A 200 means the file changed since the probe, the segments cannot be combined.
+                    logger.warning(f'{part_filename}: Unexpected status {resp.status} for the range {start}-{end}.')
+                    return False
+
+                async with aiofiles.open(part_filename, 'r+b') as f:
+                    await f.seek(position)
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        chunk = chunk[:end + 1 - position]
+                        await f.write(chunk)
+                        position += len(chunk)
+                        state['bytes'] += len(chunk)
+                        if progress is not None:
+                            progress(state['bytes'], state['total'])
+                        if throttle is not None:
+                            await throttle(len(chunk))
+
+            if position != end + 1:
+                raise aiohttp.ClientPayloadError(f'Incomplete range: {position - start} of {end + 1 - start} bytes.')
+            return True
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as er:
+            if attempt == retries:
+                logger.warning(f'{part_filename}: The range {start}-{end} failed after {retries + 1} attempts: {er}')
+                return False
+            state['retries'] += 1
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+    return False
+
+
+async def _verify_sha256(filename: str, sha256: str = None):
+    if filename is None or not sha256:
+        return filename
+
+    digest = await asyncio.get_running_loop().run_in_executor(None, _get_sha256, filename)
+    if digest != sha256.lower():
+        logger.error(f'{filename}: The sha256 {digest} does not match the expected {sha256}.')
+        await aiofiles.os.remove(filename)
+        return None
+    return filename
+
+
+async def download_file_segmented(session: aiohttp.ClientSession,
+                                  url: str,
+                                  filename: str,
+                                  progress=None,
+                                  segments: int = 4,
+                                  min_segment_size: int = SEGMENT_MIN_SIZE,
+                                  retries: int = 3,
+                                  chunk_size: int = CHUNK_SIZE,
+                                  stats: dict = None,
+                                  sha256: str = None,
+                                  throttle=None):
+    # Downloads the file over several connections with range requests, each one writing its own part of a
+    # preallocated file. Servers without ranges and files too small to split use a single stream.
+    stats = stats if stats is not None else {}
+    try:
+        probe = await _probe_ranges(session, url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as er:
+        logger.warning(f'{filename}: The range probe failed ({er}), using a single stream.')
+        probe = None
+
+    count = min(segments, probe[1] // min_segment_size) if probe is not None else 0
+    if count < 2:
+        filename = await download_file(session, url, filename, progress, retries, chunk_size, stats, throttle)
+        return await _verify_sha256(filename, sha256)
+
+    url, total, validator = probe
+    part_filename = filename + PART_SUFFIX
+    # The ranges leave holes in the file until they all complete, it can never be resumed as a single stream.
+    await _remove(part_filename + VALIDATOR_SUFFIX)
+    async with aiofiles.open(part_filename, 'wb') as f:
+        await f.truncate(total)
+
+    state = {'bytes': 0, 'retries': 0, 'total': total}
+    size = -(-total // count)
+    ranges = [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+    done = await asyncio.gather(*[_download_segment(session, url, part_filename, start, end, validator, state,
+                                                    progress, retries, chunk_size, throttle)
+                                  for start, end in ranges])
+    stats.update(bytes=state['bytes'], retries=state['retries'], segments=len(ranges))
+
+    # A segment only succeeds once its whole range was written.
+    if not all(done):
+        logger.warning(f'{filename}: The segmented download failed, using a single stream.')
+        await aiofiles.os.remove(part_filename)
+        filename = await download_file(session, url, filename, progress, retries, chunk_size, stats, throttle)
+        return await _verify_sha256(filename, sha256)
+
+    os.replace(part_filename, filename)
+    return await _verify_sha256(filename, sha256)
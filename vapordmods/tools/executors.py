@@ -0,0 +1,44 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class Executors:
+
+    def __init__(self, io_workers: int = None, cpu_processes: int = 0):
+        self.io_workers = io_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.cpu_processes = cpu_processes
+        self._io = None
+        self._cpu = None
+
+    @property
+    def io(self):
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='vapordmods-io')
+        return self._io
+
+    @property
+    def cpu(self):
+        if not self.cpu_processes:
+            return self.io
+        if self._cpu is None:
+            self._cpu = ProcessPoolExecutor(max_workers=self.cpu_processes)
+        return self._cpu
+
+    async def run_io(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io, functools.partial(func, *args, **kwargs))
+
+    async def run_cpu(self, func, *args, **kwargs):
+        # Functions sent to the process pool and their arguments must be picklable.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.cpu, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        if self._io is not None:
+            self._io.shutdown(wait=wait)
+            self._io = None
+        if self._cpu is not None:
+            self._cpu.shutdown(wait=wait)
+            self._cpu = None
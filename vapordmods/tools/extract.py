@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
+STAGING_PREFIX = '.vapordmods_staging_'
+COPY_BUFFER_SIZE = 1048576
+
+
+def _get_prefix(names: list, sub_root: str = None):
+    if not sub_root:
+        return ''
+
+    file_list = [x for x in names if sub_root in x]
+    if not file_list:
+        raise FileNotFoundError(f'No member matching {sub_root} in the archive.')
+
+    parts = file_list[0].split('/')
+    return parts[0] + '/' if len(parts) > 1 else ''
+
+
+def _get_target(destination: str, name: str, prefix: str):
+    if not name.startswith(prefix):
+        return None
+
+    relpath = name[len(prefix):]
+    if not relpath:
+        return None
+
+    target = os.path.normpath(os.path.join(destination, relpath))
+    if os.path.commonpath([destination, target]) != destination:
+        raise ValueError(f'The member {name} would be extracted outside of {destination}.')
+    return target
+
+
+def _is_unchanged(target: str, info: zipfile.ZipInfo, previous: dict):
+    if previous is None or previous.get('size') != info.file_size or previous.get('crc') != info.CRC:
+        return False
+    return os.path.isfile(target) and os.path.getsize(target) == info.file_size
+
+
+def extract_archive(filename: str, destination: str, sub_root: str = None, previous_files: dict = None):
+    destination = os.path.abspath(destination)
+    os.makedirs(destination, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=destination)
+    previous_files = previous_files or {}
+
+    try:
+        with zipfile.ZipFile(filename, 'r') as archive:
+            members = archive.infolist()
+            prefix = _get_prefix([x.filename for x in members], sub_root)
+
+            files = {}
+            staged = []
+            for info in members:
+                if info.is_dir():
+                    continue
+
+                target = _get_target(destination, info.filename, prefix)
+                if target is None:
+                    continue
+
+                relpath = os.path.relpath(target, destination).replace(os.sep, '/')
+                files[relpath] = {'size': info.file_size, 'crc': info.CRC}
+                if _is_unchanged(target, info, previous_files.get(relpath)):
+                    continue
+
+                staged_file = os.path.join(staging, str(len(staged)))
+                with archive.open(info) as src, open(staged_file, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                staged.append((staged_file, target))
+
+        # The staging area lives on the same filesystem, so each commit is an atomic rename.
+        for staged_file, target in staged:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(staged_file, target)
+        return files
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def remove_files(destination: str, relpaths: list):
+    destination = os.path.abspath(destination)
+    removed = 0
+    for relpath in relpaths:
+        target = _get_target(destination, relpath, '')
+        if target is None or not os.path.isfile(target):
+            continue
+
+        os.remove(target)
+        removed += 1
+
+        # Prune the directories left empty by the removal.
+        parent = os.path.dirname(target)
+        while parent != destination:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+    return removed
@@ -0,0 +1,146 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+
+    def __init__(self, hooks: list = None):
+        self.hooks = list(hooks or [])
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def emit(self, event: dict):
+        if not self.hooks:
+            return
+        event.setdefault('time', time.time())
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as er:
+                # A broken exporter must never stop an update.
+                logger.error(f'The metrics hook {hook} failed: {er}')
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **labels):
+        # The caller can add fields like bytes or status to the yielded event before it is emitted.
+        event = {'type': 'phase', 'name': name, **labels}
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception:
+            event['status'] = 'error'
+            raise
+        finally:
+            event['seconds'] = time.perf_counter() - start
+            event.setdefault('status', 'ok')
+            if event.get('bytes') and event['seconds'] > 0:
+                event['throughput'] = event['bytes'] / event['seconds']
+            self.emit(event)
+
+    def count(self, name: str, value: float = 1, **labels):
+        self.emit({'type': 'counter', 'name': name, 'value': value, **labels})
+
+    def gauge(self, name: str, value: float, **labels):
+        self.emit({'type': 'gauge', 'name': name, 'value': value, **labels})
+
+    def close(self):
+        for hook in self.hooks:
+            if hasattr(hook, 'close'):
+                hook.close()
+
+
+class JsonLinesExporter:
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        line = json.dumps(event, default=str) + '\n'
+        with self._lock, open(self.filename, 'a') as file:
+            file.write(line)
+
+
+class PrometheusExporter:
+    _PREFIX = 'vapordmods'
+    _LABELS = ('provider', 'phase', 'status', 'host')
+
+    def __init__(self, filename: str = None, interval: float = 5):
+        self.filename = filename
+        self.interval = interval
+        self.written_at = 0
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name: str, event: dict):
+        labels = tuple((x, str(event[x])) for x in self._LABELS if event.get(x) is not None)
+        return f'{self._PREFIX}_{name}', labels
+
+    def _add(self, name: str, event: dict, value: float):
+        key = self._key(name, event)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def __call__(self, event: dict):
+        with self._lock:
+            if event['type'] == 'phase':
+                labels = dict(event, phase=event['name'])
+                self._add('phase_seconds_sum', labels, event['seconds'])
+                self._add('phase_seconds_count', labels, 1)
+                if event.get('bytes'):
+                    self._add('phase_bytes_total', labels, event['bytes'])
+            elif event['type'] == 'counter':
+                self._add(event['name'] + '_total', event, event['value'])
+            else:
+                self.gauges[self._key(event['name'], event)] = event['value']
+
+        if self.filename is not None and time.monotonic() - self.written_at >= self.interval:
+            self.write()
+
+    @staticmethod
+    def _get_type(name: str, is_gauge: bool):
+        if is_gauge:
+            return name, 'gauge'
+        for suffix in ('_sum', '_count'):
+            if name.endswith(suffix):
+                return name[:-len(suffix)], 'summary'
+        return name, 'counter'
+
+    def render(self):
+        with self._lock:
+            metrics = sorted([(key, value, False) for key, value in self.counters.items()] +
+                             [(key, value, True) for key, value in self.gauges.items()])
+
+        lines = []
+        declared = set()
+        for (name, labels), value, is_gauge in metrics:
+            family, kind = self._get_type(name, is_gauge)
+            if family not in declared:
+                declared.add(family)
+                lines.append(f'# TYPE {family} {kind}')
+            if labels:
+                name += '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, filename: str = None):
+        # Written atomically for the node_exporter textfile collector.
+        filename = filename or self.filename
+        with open(filename + '.tmp', 'w') as file:
+            file.write(self.render())
+        os.replace(filename + '.tmp', filename)
+        self.written_at = time.monotonic()
+
+    def close(self):
+        if self.filename is not None:
+            self.write()
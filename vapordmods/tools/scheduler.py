@@ -0,0 +1,105 @@
+import asyncio
+import bisect
+import contextlib
+import itertools
+import logging
+import threading
+import time
+from vapordmods.tools.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BandwidthLimiter:
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.available_at = time.monotonic()
+        # Shared by the event loop, the io threads and the steam thread.
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes: int):
+        # Returns how long the caller has to pause after receiving nbytes to stay under the rate.
+        with self._lock:
+            now = time.monotonic()
+            self.available_at = max(self.available_at, now) + nbytes / self.rate
+            return self.available_at - now
+
+    async def throttle(self, nbytes: int):
+        await asyncio.sleep(self.reserve(nbytes))
+
+    def throttle_sync(self, nbytes: int):
+        time.sleep(self.reserve(nbytes))
+
+
+class DownloadScheduler:
+    # Unknown sizes are queued after the known ones, in their submission order.
+    _UNKNOWN_SIZE = float('inf')
+
+    def __init__(self, max_downloads: int = 16, max_per_host: int = 8, bandwidth: float = None,
+                 metrics: Metrics = None):
+        self.max_downloads = max_downloads
+        self.max_per_host = max_per_host
+        self.bandwidth = BandwidthLimiter(bandwidth) if bandwidth else None
+        self.metrics = metrics or Metrics()
+        self.active = 0
+        self.hosts = {}
+        self._queue = []
+        self._counter = itertools.count()
+
+    def get_status(self):
+        return {'queued': len(self._queue), 'active': self.active, 'hosts': dict(self.hosts)}
+
+    def is_full(self):
+        return bool(self._queue) or self.active >= self.max_downloads
+
+    def __report(self):
+        self.metrics.gauge('download_queue', len(self._queue))
+        self.metrics.gauge('download_active', self.active)
+
+    def __start(self, host: str):
+        self.active += 1
+        self.hosts[host] = self.hosts.get(host, 0) + 1
+
+    def __dispatch(self):
+        # The smallest job whose host is under its cap starts first, so small mods are not stuck behind large ones.
+        idx = 0
+        while idx < len(self._queue) and self.active < self.max_downloads:
+            size, _, host, future = self._queue[idx]
+            if future.done() or self.hosts.get(host, 0) >= self.max_per_host:
+                idx += 1
+                continue
+            del self._queue[idx]
+            self.__start(host)
+            future.set_result(None)
+        self.__report()
+
+    def __release(self, host: str):
+        self.active -= 1
+        self.hosts[host] -= 1
+        if not self.hosts[host]:
+            del self.hosts[host]
+        self.__dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str, size: int = None):
+        future = asyncio.get_running_loop().create_future()
+        job = (size if size is not None else self._UNKNOWN_SIZE, next(self._counter), host, future)
+        bisect.insort(self._queue, job)
+        self.__dispatch()
+
+        with self.metrics.phase('queue', host=host):
+            try:
+                await future
+            except asyncio.CancelledError:
+                if job in self._queue:
+                    self._queue.remove(job)
+                    self.__report()
+                elif future.done() and not future.cancelled():
+                    self.__release(host)
+                raise
+
+        try:
+            yield self.bandwidth
+        finally:
+            self.__release(host)
@@ -1,21 +1,43 @@
+import logging
+import sys
+import gevent.monkey
 from steam.monkey import patch_minimal
+
+# gevent cannot patch the ssl names already imported by aiohttp (vapordmods.mods) or urllib3, importing this module
+# first avoids it.
+_SSL_IMPORTERS = ('aiohttp', 'urllib3')
+if not gevent.monkey.is_module_patched('ssl') and any(x in sys.modules for x in _SSL_IMPORTERS):
+    logging.getLogger(__name__).warning('vapordmods.tools.steamcmd was imported after aiohttp or requests, the gevent '
+                                        'monkey patch of ssl may not apply to them.')
 patch_minimal()
 
-import logging
+import hashlib
 import os
+import threading
+import time
 import asyncio
 import aiofiles
 import aiofiles.os
+import gevent
+import gevent.event
 from builtins import staticmethod
+from gevent.pool import Pool as GPool
+from requests.adapters import HTTPAdapter
 from steam.client import SteamClient
-from steam.client.cdn import CDNClient, CDNDepotFile
+from steam.client.cdn import CDNClient, CDNDepotFile, CDNDepotManifest
 from steam.enums import EResult
 from steam.client.builtins.web import webapi, make_requests_session
-from steam.exceptions import ManifestError
+from steam.exceptions import ManifestError, SteamError
+from vapordmods.tools.executors import Executors
+from vapordmods.tools.metrics import Metrics
+from vapordmods.tools.scheduler import BandwidthLimiter
 from vapordmods.tools.utils import get_user_app_data
 
 LOG = logging.getLogger(__name__)
 
+STEAMPIPE_BUFFER_SIZE = 1048576
+MANIFEST_REQUEST_CODE_TTL = 300
+
 
 class SteamManager:
 
@@ -25,7 +47,11 @@ class SteamManager:
                  web_api_key: str = None,
                  steam_guard_code: str = None,
                  two_factor_code: str = None,
-                 user_app_data_dir: str = None
+                 user_app_data_dir: str = None,
+                 download_workers: int = 4,
+                 executors: Executors = None,
+                 metrics: Metrics = None,
+                 http_pool_size: int = 32
                  ):
         if steam_guard_code and two_factor_code:
             LOG.error('steam_guard_code and two_factor_code are not None. You can only provide one of them.')
@@ -37,10 +63,26 @@ class SteamManager:
         self.password = password
         self.steam_guard_code = steam_guard_code
         self.two_factor_code = two_factor_code
+        self.download_workers = download_workers
+        self.executors = executors or Executors()
+        self.metrics = metrics or Metrics()
+        self.http_pool_size = http_pool_size
+        self._steam_loop = None
+        self._steam_stop = None
+        self._steam_lock = threading.Lock()
+        self._login_lock = None
+        self._cdn_lock = None
+        self.cdn = None
+        self.http = None
+        self.manifests = {}
+        self.manifest_request_codes = {}
 
         self.user_app_data_dir = user_app_data_dir or os.path.join(get_user_app_data(), '.vapordmods')
         os.makedirs(self.user_app_data_dir, exist_ok=True)
 
+        self.manifests_dir = os.path.join(self.user_app_data_dir, 'manifests')
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
         self.client.set_credential_location(self.user_app_data_dir)
 
         @client.on('error')
@@ -58,8 +100,61 @@ class SteamManager:
         @client.on("disconnected")
         def handle_disconnect():
             LOG.info("Disconnected.")
+            self.manifest_request_codes.clear()
+
+    def _steam_main(self, ready: threading.Event):
+        hub = gevent.get_hub()
+        self._steam_stop = gevent.event.Event()
+        keepalive = hub.loop.async_()
+        keepalive.start(lambda: None)
+        self._steam_loop = hub.loop
+        ready.set()
+        self._steam_stop.wait()
+        keepalive.close()
+
+    def _get_steam_loop(self):
+        with self._steam_lock:
+            if self._steam_loop is None:
+                ready = threading.Event()
+                threading.Thread(target=self._steam_main, args=(ready,), name='vapordmods-steam', daemon=True).start()
+                ready.wait()
+            return self._steam_loop
 
-    async def login(self):
+    @staticmethod
+    def _set_future(future: asyncio.Future, result=None, error: Exception = None):
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def _run_steam(self, func, *args, **kwargs):
+        # gevent binds the SteamClient sockets to the hub of one thread, so every call using them runs there. Each
+        # call is a greenlet of that hub, the calls of concurrent workshop items interleave while they wait on IO.
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def run():
+            try:
+                result = func(*args, **kwargs)
+            except Exception as er:
+                loop.call_soon_threadsafe(self._set_future, future, None, er)
+            else:
+                loop.call_soon_threadsafe(self._set_future, future, result)
+
+        self._get_steam_loop().run_callback_threadsafe(gevent.spawn, run)
+        return await future
+
+    def close(self):
+        if self._steam_loop is not None:
+            self._steam_loop.run_callback_threadsafe(self._steam_stop.set)
+            self._steam_loop = None
+        if self.http is not None:
+            self.http.close()
+            self.http = None
+
+    def _login(self):
         if not self.client.connected:
             if self.client.relogin_available:
                 self.client.relogin()
@@ -82,77 +177,246 @@ class SteamManager:
                 return 1
         return 0
 
-    async def search_workshop_item_manifest(self, published_file_id: int):
-        params = {
-            'key': self.web_api_key,
-            'publishedfileids': [published_file_id],
-            'includetags': 1,
-            'includeadditionalpreviews': 1,
-            'includechildren': 1,
-            'includekvtags': 1,
-            'includevotes': 1,
-            'includeforsaledata': 1,
-            'includemetadata': 1,
-            'return_playtime_stats': 1,
-            'strip_description_bbcode': 1,
-        }
+    async def login(self):
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        # Concurrent workshop items share the logon of the first one.
+        async with self._login_lock:
+            return await self._run_steam(self._login)
+
+    async def search_workshop_items_manifest(self, published_file_ids: list, chunk_size: int = 100):
+        ids = list(dict.fromkeys(int(x) for x in published_file_ids))
+        results = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            params = {
+                'key': self.web_api_key,
+                'publishedfileids': chunk,
+                'includetags': 1,
+                'includeadditionalpreviews': 1,
+                'includechildren': 1,
+                'includekvtags': 1,
+                'includevotes': 1,
+                'includeforsaledata': 1,
+                'includemetadata': 1,
+                'return_playtime_stats': 1,
+                'strip_description_bbcode': 1,
+            }
 
-        try:
-            result = webapi.get('IPublishedFileService',
-                                'GetDetails',
-                                params=params)['response']['publishedfiledetails'][0]
-        except Exception as er:
-            LOG.error(f'Query to the published file id {published_file_id} failed: {er}')
-            return 1
+            try:
+                response = await self.executors.run_io(webapi.get, 'IPublishedFileService', 'GetDetails',
+                                                       params=params)
+                details = response['response']['publishedfiledetails']
+            except Exception as er:
+                LOG.error(f'Query to the published file ids {chunk} failed: {er}')
+                continue
+
+            for result in details:
+                if result['result'] != EResult.OK:
+                    LOG.error(f"Query to the published file id {result['publishedfileid']} result : "
+                              f"{EResult(result['result'])}")
+                    continue
+                results[str(result['publishedfileid'])] = result
 
-        if result['result'] != EResult.OK:
-            LOG.error(f"Query to the published file id {published_file_id} result : {EResult(result['result'])}")
-            return 1
+        return results
 
-        return result
+    async def search_workshop_item_manifest(self, published_file_id: int):
+        result = await self.search_workshop_items_manifest([published_file_id])
+        return result.get(str(published_file_id), 1)
 
-    @staticmethod
-    async def _download_file_url(mods_dir, url, file):
-        session = make_requests_session()
-        stream = session.get(url, stream=True)
+    def get_http_session(self):
+        # Shared by the io threads, the connections to the workshop file servers are kept alive between items.
+        if self.http is None:
+            self.http = make_requests_session()
+            self._mount_pool(self.http)
+        return self.http
 
+    def _mount_pool(self, session):
+        adapter = HTTPAdapter(pool_connections=self.http_pool_size, pool_maxsize=self.http_pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    @staticmethod
+    def _download_file_url_sync(session, mods_dir, url, file, bandwidth: BandwidthLimiter = None):
         ws_file = os.path.join(mods_dir, file)
+        downloaded = 0
+        with session.get(url, stream=True) as stream:
+            stream.raise_for_status()
+            with open(ws_file + '.part', 'wb') as f:
+                for chunk in stream.iter_content(STEAMPIPE_BUFFER_SIZE):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if bandwidth is not None:
+                        bandwidth.throttle_sync(len(chunk))
+        os.replace(ws_file + '.part', ws_file)
+        return downloaded
+
+    async def _download_file_url(self, mods_dir, url, file, bandwidth: BandwidthLimiter = None):
+        await aiofiles.os.makedirs(mods_dir, exist_ok=True)
+        return await self.executors.run_io(self._download_file_url_sync, self.get_http_session(), mods_dir, url, file,
+                                           bandwidth)
+
+    @staticmethod
+    def _file_sha1(filename: str):
+        sha = hashlib.sha1()
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(STEAMPIPE_BUFFER_SIZE), b''):
+                sha.update(chunk)
+        return sha.digest()
+
+    @classmethod
+    def _sync_depot_file(cls, dfile: CDNDepotFile, filename: str, bandwidth: BandwidthLimiter = None):
+        # Runs on the gevent hub, the files already up to date are filtered out on the io pool by the caller.
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        manifest = dfile.manifest
+        downloaded = 0
+        local = open(filename, 'rb') if os.path.isfile(filename) else None
+        try:
+            with open(filename + '.part', 'wb') as f:
+                # Chunks are sorted by offset, so the file is written sequentially.
+                for chunk in dfile.chunks:
+                    data = None
+                    if local is not None:
+                        local.seek(chunk.offset)
+                        data = local.read(chunk.cb_original)
+                        if hashlib.sha1(data).digest() != chunk.sha:
+                            data = None
+
+                    if data is None:
+                        data = manifest.cdn_client.get_chunk(manifest.app_id, manifest.depot_id, chunk.sha.hex())
+                        downloaded += len(data)
+                        if bandwidth is not None:
+                            # Runs in a greenlet of the steam thread, only gevent can pause it.
+                            gevent.sleep(bandwidth.reserve(len(data)))
+
+                    f.seek(chunk.offset)
+                    f.write(data)
+                f.truncate(dfile.size)
+        finally:
+            if local is not None:
+                local.close()
+
+        os.replace(filename + '.part', filename)
+        return downloaded
+
+    def _make_cdn(self):
+        cdn = CDNClient(self.client)
+        # The chunks of every concurrent item go through the connections of this CDN client.
+        self._mount_pool(cdn.web)
+        return cdn
+
+    async def get_cdn(self):
+        if self._cdn_lock is None:
+            self._cdn_lock = asyncio.Lock()
+        async with self._cdn_lock:
+            if await self.login() != 0:
+                return None
+            if self.cdn is None:
+                self.cdn = await self._run_steam(self._make_cdn)
+        return self.cdn
+
+    def _get_manifest_request_code(self, cdn: CDNClient, app_id: int, depot_id: int, manifest_gid: int):
+        key = app_id, depot_id, manifest_gid
+        code, expires_at = self.manifest_request_codes.get(key, (None, 0))
+        if code is None or time.time() >= expires_at:
+            code = cdn.get_manifest_request_code(*key)
+            self.manifest_request_codes[key] = code, time.time() + MANIFEST_REQUEST_CODE_TTL
+        return code
+
+    async def _get_manifest(self, app_id: int, depot_id: int, manifest_gid: int):
+        key = int(app_id), int(depot_id), int(manifest_gid)
+        if key in self.manifests:
+            self.metrics.count('manifest_cache', status='memory', provider='workshop')
+            return self.manifests[key]
+
+        filename = os.path.join(self.manifests_dir, '{}_{}_{}.manifest'.format(*key))
+        cached = await aiofiles.os.path.exists(filename)
+        self.metrics.count('manifest_cache', status='disk' if cached else 'miss', provider='workshop')
+        if cached:
+            async with aiofiles.open(filename, 'rb') as f:
+                # The CDN client is attached later, only if some chunks have to be downloaded.
+                manifest = CDNDepotManifest(self.cdn, key[0], await f.read())
+            LOG.debug(f'The manifest {manifest_gid} of the depot {depot_id} was loaded from the cache.')
+        else:
+            cdn = await self.get_cdn()
+            if cdn is None:
+                LOG.error(f'Cannot login to get the manifest {manifest_gid} of the depot {depot_id}.')
+                return None
+
+            manifest_code = await self._run_steam(self._get_manifest_request_code, cdn, *key)
+            manifest = await self._run_steam(cdn.get_manifest, *key, manifest_request_code=manifest_code)
+            async with aiofiles.open(filename + '.part', 'wb') as f:
+                await f.write(manifest.serialize())
+            os.replace(filename + '.part', filename)
+
+        self.manifests[key] = manifest
+        return manifest
+
+    @classmethod
+    def _is_synced(cls, dfile: CDNDepotFile, filename: str):
+        return os.path.isfile(filename) and os.path.getsize(filename) == dfile.size \
+            and cls._file_sha1(filename) == dfile.file_mapping.sha_content
+
+    def _sync_depot_files(self, files: list, bandwidth: BandwidthLimiter = None):
+        def sync(item):
+            try:
+                return self._sync_depot_file(*item, bandwidth)
+            except Exception as er:
+                return er
 
-        async with aiofiles.open(ws_file, 'wb') as f:
-            for chunk in iter(lambda: stream.raw.read(8388608), b''):
-                await f.write(chunk)
+        # The chunks are fetched by a bounded pool of greenlets running on the steam thread.
+        return list(GPool(self.download_workers).imap(sync, files))
 
-    async def _download_from_steampipe(self, mods_dir: str, pubfile: dict):
-        async def dl_file(dfile: CDNDepotFile):
-            file = dfile.read()
-            path = os.path.join(mods_dir, pubfile['title'])
-            await aiofiles.os.makedirs(path, exist_ok=True)
+    async def _download_from_steampipe(self, mods_dir: str, pubfile: dict, stats: dict = None,
+                                       bandwidth: BandwidthLimiter = None):
+        stats = stats if stats is not None else {}
+        try:
+            manifest = await self._get_manifest(pubfile['consumer_appid'], pubfile['consumer_appid'],
+                                                pubfile['hcontent_file'])
+        except (ManifestError, SteamError) as er:
+            LOG.error(er)
+            return 1
 
-            filename = os.path.join(path, dfile.filename)
-            async with aiofiles.open(filename, 'wb') as f:
-                await f.write(file)
+        if manifest is None:
+            return 1
 
-        if await self.login() == 0:
-            key = pubfile['consumer_appid'], pubfile['consumer_appid'], pubfile['hcontent_file']
-            cdn = CDNClient(self.client)
-            try:
-                manifest_code = cdn.get_manifest_request_code(*key)
-                manifest = cdn.get_manifest(*key, manifest_request_code=manifest_code)
-            except ManifestError as er:
-                LOG.error(er)
+        path = os.path.join(mods_dir, pubfile['title'])
+        await aiofiles.os.makedirs(path, exist_ok=True)
+        files = []
+        for mfile in manifest:
+            if mfile.is_directory:
+                await aiofiles.os.makedirs(os.path.join(path, mfile.filename), exist_ok=True)
+            elif mfile.is_file:
+                files.append((mfile, os.path.join(path, mfile.filename)))
+
+        synced = await asyncio.gather(*[self.executors.run_io(self._is_synced, *x) for x in files])
+        to_dl = [x for x, is_synced in zip(files, synced) if not is_synced]
+        stats.update(files=len(files), skipped=len(files) - len(to_dl), bytes=0)
+        if not to_dl:
+            LOG.info(f"The published file id {pubfile['publishedfileid']} is already up to date.")
+            return 0
+
+        if manifest.cdn_client is None:
+            manifest.cdn_client = await self.get_cdn()
+            if manifest.cdn_client is None:
+                LOG.error(f"Cannot login to download the published file id {pubfile['publishedfileid']}.")
                 return 1
 
-            to_dl = []
-            for mfile in manifest:
-                if not mfile.is_file:
-                    continue
-                to_dl.append(dl_file(mfile))
-            await asyncio.gather(*to_dl)
+        results = await self._run_steam(self._sync_depot_files, to_dl, bandwidth)
+        errors = [x for x in results if isinstance(x, Exception)]
+        for er in errors:
+            LOG.error(er)
 
-    async def update_worksop_mod(self, mods_dir: str, published_file_id: int, pubfile: dict = None):
+        stats['bytes'] = sum(x for x in results if not isinstance(x, Exception))
+        LOG.info(f"{stats['bytes']} bytes downloaded for the published file id {pubfile['publishedfileid']}, "
+                 f"{len(files) - len(to_dl)} files were already up to date.")
+        return 1 if errors else 0
+
+    async def update_worksop_mod(self, mods_dir: str, published_file_id: int, pubfile: dict = None,
+                                 bandwidth: BandwidthLimiter = None):
         if pubfile is None:
             pubfile = await self.search_workshop_item_manifest(published_file_id)
-            if not pubfile:
+            if pubfile == 1:
                 return 1
 
         if pubfile['result'] != EResult.OK:
@@ -162,12 +426,19 @@ class SteamManager:
         LOG.info(f"Updating the published file id {pubfile['publishedfileid']} for "
                  f"the app id {pubfile['consumer_appid']}.")
 
-        if pubfile.get('file_url'):
-            await self._download_file_url(mods_dir, pubfile['file_url'], pubfile['filename'])
-        elif pubfile.get('hcontent_file'):
-            await self._download_from_steampipe(mods_dir, pubfile)
-        else:
-            LOG.error(f"Cannot download the file for the  published file id {pubfile['publishedfileid']}")
-            return 1
+        with self.metrics.phase('download', provider='workshop', app=pubfile['consumer_appid'],
+                                mods=pubfile['publishedfileid']) as event:
+            if pubfile.get('file_url'):
+                event['bytes'] = await self._download_file_url(mods_dir, pubfile['file_url'], pubfile['filename'],
+                                                               bandwidth)
+            elif pubfile.get('hcontent_file'):
+                result = await self._download_from_steampipe(mods_dir, pubfile, event, bandwidth)
+                if result != 0:
+                    event['status'] = 'error'
+                return result
+            else:
+                event['status'] = 'error'
+                LOG.error(f"Cannot download the file for the  published file id {pubfile['publishedfileid']}")
+                return 1
 
         return 0